@@ -0,0 +1,511 @@
+import datetime
+import logging
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from catalog.models import Product
+from .models import Cart, CartItem
+from .reservations import release, reservations_enabled, reserve
+
+logger = logging.getLogger(__name__)
+
+
+def check_stock(product, quantity):
+    if product.stock < quantity:
+        raise serializers.ValidationError("Not enough stock available.")
+
+
+def touch(carts):
+    """Mark ``carts`` as just changed, keeping them from being cleaned up as abandoned."""
+    carts.update(updated_at=timezone.now())
+
+
+def apply_operations(quantities, operations, products):
+    """
+    Play batch ``operations`` over ``product id -> quantity`` and return the
+    new quantities, checked against the stock of ``products``. Raises one
+    ``ValidationError`` naming every failing operation by index.
+    """
+    quantities = dict(quantities)
+    errors = {}
+    for index, operation in enumerate(operations):
+        product_id = operation["product_id"]
+        if operation["op"] == "remove":
+            if quantities.pop(product_id, None) is None:
+                errors[index] = ["Product is not in the cart."]
+        elif product_id not in products:
+            errors[index] = ["Product not found."]
+        elif operation["op"] == "add":
+            quantities[product_id] = quantities.get(product_id, 0) + operation.get("quantity", 1)
+        elif operation["quantity"]:
+            quantities[product_id] = operation["quantity"]
+        else:
+            quantities.pop(product_id, None)  # Set to 0
+    for index, operation in enumerate(operations):
+        product = products.get(operation["product_id"])
+        if index not in errors and product is not None and product.stock < quantities.get(product.pk, 0):
+            errors[index] = ["Not enough stock available."]
+    if errors:
+        raise serializers.ValidationError({"operations": dict(sorted(errors.items()))})
+    return quantities
+
+
+# Add to cart in one round trip: find or create the cart, then insert the line
+# or add to its quantity, as long as the product has the stock for the total.
+# Concurrent adds of the same product serialize on the line's row lock, so no
+# increment is lost. Returns no row when the product is missing or short.
+ADD_ITEM_SQL = """
+WITH cart AS (
+    INSERT INTO cart_cart (user_id, created_at, updated_at)
+    VALUES (%(user)s, now(), now())
+    ON CONFLICT (user_id) DO UPDATE SET updated_at = EXCLUDED.updated_at
+    RETURNING id
+)
+INSERT INTO cart_cartitem (cart_id, product_id, quantity)
+SELECT cart.id, product.id, %(quantity)s
+FROM cart, catalog_product AS product
+WHERE product.id = %(product)s AND product.stock >= %(quantity)s
+ON CONFLICT (cart_id, product_id) DO UPDATE
+SET quantity = cart_cartitem.quantity + EXCLUDED.quantity
+WHERE cart_cartitem.quantity + EXCLUDED.quantity <= (
+    SELECT stock FROM catalog_product WHERE id = EXCLUDED.product_id
+)
+RETURNING id, cart_id, quantity
+"""
+
+
+class DatabaseCartBackend:
+    """
+    Carts live in the ``Cart``/``CartItem`` tables; line ids are ``CartItem`` ids.
+    """
+
+    def get_cart(self, user):
+        # Cart, then items with their products and categories: two queries
+        # whatever the cart holds
+        items = CartItem.objects.select_related("product__category").order_by("id")
+        cart, _ = Cart.objects.prefetch_related(
+            Prefetch("items", queryset=items)
+        ).get_or_create(user=user)
+        return cart
+
+    def add_item(self, user, product_id, quantity):
+        if reservations_enabled():
+            with transaction.atomic():
+                row = self._add_line(user, product_id, quantity)
+                if row is not None:
+                    # Hold the whole line: an earlier hold on it may have expired
+                    release(row[1], [product_id])
+                    if reserve(row[1], {product_id: row[2]}):
+                        transaction.set_rollback(True)
+                        row = None
+        else:
+            row = self._add_line(user, product_id, quantity)
+        if row is None:
+            # Missing product or not enough stock: only failures pay for a second query
+            get_object_or_404(Product.objects.only("id"), pk=product_id)
+            raise serializers.ValidationError("Not enough stock available.")
+        return CartItem(id=row[0], cart_id=row[1], product_id=product_id, quantity=row[2])
+
+    def _add_line(self, user, product_id, quantity):
+        with connection.cursor() as cursor:
+            cursor.execute(ADD_ITEM_SQL, {"user": user.pk, "product": product_id, "quantity": quantity})
+            return cursor.fetchone()
+
+    def update_item(self, user, item_id, quantity):
+        item = get_object_or_404(
+            CartItem.objects.select_related("product__category"), pk=item_id, cart__user=user
+        )
+        check_stock(item.product, quantity)
+        item.quantity = quantity
+        with transaction.atomic():
+            item.save(update_fields=["quantity"])
+            touch(Cart.objects.filter(pk=item.cart_id))
+            if reservations_enabled():
+                release(item.cart_id, [item.product_id])
+                if reserve(item.cart_id, {item.product_id: quantity}):
+                    raise serializers.ValidationError("Not enough stock available.")
+        return item
+
+    def remove_item(self, user, item_id):
+        items = CartItem.objects.filter(pk=item_id, cart__user=user)
+        with transaction.atomic():
+            if reservations_enabled():
+                for cart_id, product_id in items.values_list("cart_id", "product_id"):
+                    release(cart_id, [product_id])
+            deleted, _ = items.delete()
+            if deleted:
+                touch(Cart.objects.filter(user=user))
+        if not deleted:
+            raise Http404
+
+    def clear(self, user):
+        with transaction.atomic():
+            if reservations_enabled():
+                for cart_id in Cart.objects.filter(user=user).values_list("pk", flat=True):
+                    release(cart_id)
+            CartItem.objects.filter(cart__user=user).delete()
+            touch(Cart.objects.filter(user=user))
+
+    def apply(self, user, operations):
+        """Apply batch ``operations`` in one transaction and return the cart."""
+        product_ids = {operation["product_id"] for operation in operations}
+        with transaction.atomic():
+            # Locking the cart row serializes concurrent writes to it, inserts
+            # of lines it does not have yet included
+            cart, _ = Cart.objects.select_for_update().get_or_create(user=user)
+            products = Product.objects.only("id", "stock").in_bulk(product_ids)
+            items = {
+                item.product_id: item
+                for item in CartItem.objects.select_for_update().filter(cart=cart, product_id__in=product_ids)
+            }
+            quantities = apply_operations(
+                {product_id: item.quantity for product_id, item in items.items()}, operations, products
+            )
+            created, updated = [], []
+            for product_id, quantity in quantities.items():
+                item = items.get(product_id)
+                if item is None:
+                    created.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+                elif item.quantity != quantity:
+                    item.quantity = quantity
+                    updated.append(item)
+            removed = items.keys() - quantities.keys()
+            if created:
+                CartItem.objects.bulk_create(created)
+            if updated:
+                CartItem.objects.bulk_update(updated, ["quantity"])
+            if removed:
+                CartItem.objects.filter(cart=cart, product_id__in=removed).delete()
+            touch(Cart.objects.filter(pk=cart.pk))
+            if reservations_enabled():
+                self._rereserve(cart, operations, quantities, {item.product_id for item in created + updated} | removed)
+        return self.get_cart(user)
+
+    def _rereserve(self, cart, operations, quantities, changed):
+        """Replace the holds of the ``changed`` lines with their new quantities."""
+        release(cart.pk, changed)
+        short = reserve(cart.pk, {product_id: quantities[product_id] for product_id in changed & quantities.keys()})
+        if short:
+            raise serializers.ValidationError({"operations": {
+                index: ["Not enough stock available."]
+                for index, operation in enumerate(operations)
+                if operation["product_id"] in short
+            }})
+
+    @contextmanager
+    def checkout_session(self, user):
+        """
+        Around a checkout of ``user``'s cart: have the database cart current
+        on entry, and the live copy reflect the checkout on a clean exit.
+        The database is the live copy here.
+        """
+        yield
+
+    def flush_pending(self):
+        """Write every cart changed since its last flush; returns how many."""
+        return 0
+
+
+# Idempotent first load of a cart from the database: a concurrent writer may
+# already have loaded (and changed) it
+_LOAD = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[2], 'id', ARGV[2], 'created_at', ARGV[3], 'version', 0)
+for index = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[index], ARGV[index + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Every change bumps the cart's version, which tells a checkout whether the
+# cart changed after it was flushed
+
+# Add ARGV[3] units of ARGV[2], unless that takes the line past ARGV[4] in stock
+_ADD = """
+local quantity = redis.call('HINCRBY', KEYS[1], ARGV[2], ARGV[3])
+if quantity > tonumber(ARGV[4]) then
+    redis.call('HINCRBY', KEYS[1], ARGV[2], -tonumber(ARGV[3]))
+    return -1
+end
+redis.call('HINCRBY', KEYS[2], 'version', 1)
+redis.call('SADD', KEYS[3], ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return quantity
+"""
+
+# Set ARGV[2]'s quantity to ARGV[3] if the line exists
+_SET = """
+if redis.call('HEXISTS', KEYS[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('HINCRBY', KEYS[2], 'version', 1)
+redis.call('SADD', KEYS[3], ARGV[4])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Remove line ARGV[2], or every line without it
+_REMOVE = """
+local removed
+if ARGV[2] == '' then
+    removed = redis.call('DEL', KEYS[1])
+else
+    removed = redis.call('HDEL', KEYS[1], ARGV[2])
+end
+redis.call('HINCRBY', KEYS[2], 'version', 1)
+redis.call('SADD', KEYS[3], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return removed
+"""
+
+# After a checkout of the snapshot taken at version ARGV[2] (product id,
+# quantity pairs from ARGV[4]): drop the live cart if it is unchanged since,
+# otherwise take the checked-out units off it, keeping later changes
+_SETTLE = """
+if (redis.call('HGET', KEYS[2], 'version') or '0') == ARGV[2] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    redis.call('SREM', KEYS[3], ARGV[3])
+    return 0
+end
+for index = 4, #ARGV, 2 do
+    if redis.call('HINCRBY', KEYS[1], ARGV[index], -tonumber(ARGV[index + 1])) <= 0 then
+        redis.call('HDEL', KEYS[1], ARGV[index])
+    end
+end
+redis.call('SADD', KEYS[3], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+class RedisCartBackend:
+    """
+    Live carts in Redis, written behind to the database.
+
+    Each cart is a hash of ``product id -> quantity`` changed with atomic
+    ``HINCRBY``/``HSET`` scripts (stock guard included), so cart clicks cost
+    no database writes. Changed carts are marked dirty and flushed to
+    ``Cart``/``CartItem`` by the ``cart.tasks.flush_carts`` beat task, and
+    synchronously at checkout: the tables stay the source of truth for
+    checkout and admin. A cart missing from Redis is loaded from them on
+    first use. Line ids are product ids.
+
+    Flushes of one cart are serialized by a per-cart lock, which a checkout
+    holds from its flush until the checked-out lines are off the live cart,
+    so the beat task never writes them back.
+    """
+
+    DIRTY_KEY = "cart:dirty"
+    # Upper bound in seconds on one flush, or a checkout holding the lock
+    FLUSH_LOCK_TIMEOUT = 30
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        if reservations_enabled():
+            raise ImproperlyConfigured("Stock reservations need the database cart backend.")
+
+        self.redis = get_redis_connection("default")
+        self.ttl = settings.CART_REDIS_TTL
+        self._load = self.redis.register_script(_LOAD)
+        self._add = self.redis.register_script(_ADD)
+        self._set = self.redis.register_script(_SET)
+        self._remove = self.redis.register_script(_REMOVE)
+        self._settle = self.redis.register_script(_SETTLE)
+
+    def _keys(self, user_id):
+        return [f"cart:{user_id}", f"cart:{user_id}:meta", self.DIRTY_KEY]
+
+    def _ensure_loaded(self, user):
+        items_key, meta_key, _ = keys = self._keys(user.pk)
+        if self.redis.exists(meta_key):
+            return keys
+        cart, _ = Cart.objects.get_or_create(user=user)
+        lines = cart.items.values_list("product_id", "quantity")
+        self._load(keys=[items_key, meta_key], args=[
+            self.ttl, cart.pk, cart.created_at.isoformat(), *(value for line in lines for value in line),
+        ])
+        return keys
+
+    def get_cart(self, user):
+        items_key, meta_key, _ = self._ensure_loaded(user)
+        pipe = self.redis.pipeline()
+        pipe.hgetall(items_key)
+        pipe.hgetall(meta_key)
+        quantities, meta = pipe.execute()
+        quantities = {int(product_id): int(quantity) for product_id, quantity in quantities.items()}
+
+        cart = Cart(
+            id=int(meta[b"id"]),
+            user=user,
+            created_at=datetime.datetime.fromisoformat(meta[b"created_at"].decode()),
+        )
+        products = Product.objects.select_related("category").in_bulk(quantities)
+        # Stands in for the prefetch of the database backend
+        cart._prefetched_objects_cache = {"items": [
+            CartItem(id=product_id, cart=cart, product=products[product_id], quantity=quantity)
+            for product_id, quantity in sorted(quantities.items())
+            if product_id in products
+        ]}
+        return cart
+
+    def add_item(self, user, product_id, quantity):
+        product = get_object_or_404(Product.objects.only("id", "stock"), pk=product_id)
+        check_stock(product, quantity)
+        keys = self._ensure_loaded(user)
+        total = self._add(keys=keys, args=[self.ttl, product.pk, quantity, product.stock, user.pk])
+        if total < 0:
+            raise serializers.ValidationError("Not enough stock available.")
+        return CartItem(id=product.pk, product=product, quantity=total)
+
+    def update_item(self, user, item_id, quantity):
+        product = get_object_or_404(Product.objects.select_related("category"), pk=item_id)
+        check_stock(product, quantity)
+        keys = self._ensure_loaded(user)
+        if not self._set(keys=keys, args=[self.ttl, item_id, quantity, user.pk]):
+            raise Http404
+        return CartItem(id=product.pk, product=product, quantity=quantity)
+
+    def remove_item(self, user, item_id):
+        keys = self._ensure_loaded(user)
+        if not self._remove(keys=keys, args=[self.ttl, item_id, user.pk]):
+            raise Http404
+
+    def clear(self, user):
+        keys = self._ensure_loaded(user)
+        self._remove(keys=keys, args=[self.ttl, "", user.pk])
+
+    def apply(self, user, operations):
+        """Apply batch ``operations`` in one Redis transaction and return the cart."""
+        product_ids = {operation["product_id"] for operation in operations}
+        products = Product.objects.only("id", "stock").in_bulk(product_ids)
+        items_key, meta_key, dirty_key = self._ensure_loaded(user)
+
+        def write(pipe):
+            current = {
+                int(product_id): int(quantity)
+                for product_id, quantity in pipe.hgetall(items_key).items()
+            }
+            quantities = apply_operations(current, operations, products)
+            pipe.multi()
+            removed = current.keys() - quantities.keys()
+            if removed:
+                pipe.hdel(items_key, *removed)
+            changed = {
+                product_id: quantity
+                for product_id, quantity in quantities.items()
+                if current.get(product_id) != quantity
+            }
+            if changed:
+                pipe.hset(items_key, mapping=changed)
+            pipe.hincrby(meta_key, "version", 1)
+            pipe.sadd(dirty_key, user.pk)
+            pipe.expire(items_key, self.ttl)
+            pipe.expire(meta_key, self.ttl)
+
+        # Retried if another request changes the cart in between
+        self.redis.transaction(write, items_key)
+        return self.get_cart(user)
+
+    def _flush_lock(self, user_id):
+        return self.redis.lock(
+            f"cart:{user_id}:flush", timeout=self.FLUSH_LOCK_TIMEOUT, blocking_timeout=self.FLUSH_LOCK_TIMEOUT
+        )
+
+    @contextmanager
+    def checkout_session(self, user):
+        keys = self._ensure_loaded(user)
+        with self._flush_lock(user.pk):
+            snapshot = self._flush(user.pk)
+            yield
+            if snapshot is not None:
+                quantities, version = snapshot
+                self._settle(keys=keys, args=[
+                    self.ttl, version, user.pk, *(value for line in quantities.items() for value in line),
+                ])
+
+    def flush_pending(self):
+        flushed = 0
+        for user_id in self.redis.sscan_iter(self.DIRTY_KEY):
+            user_id = int(user_id)
+            lock = self._flush_lock(user_id)
+            if not lock.acquire(blocking=False):
+                continue  # Being flushed by a checkout; still marked if changed since
+            try:
+                self._flush(user_id)
+            except Exception:
+                # Stays marked for the next run; don't hold up the other carts
+                logger.exception("Could not flush cart of user %s", user_id)
+                continue
+            finally:
+                lock.release()
+            flushed += 1
+        return flushed
+
+    def _flush(self, user_id):
+        """
+        Write the cart to the database if it is marked dirty; call with its
+        flush lock held. Returns the ``(quantities, version)`` snapshot read
+        from Redis, or ``None`` when the cart is not there.
+        """
+        items_key, meta_key, dirty_key = self._keys(user_id)
+        # Unmark first: a change made while flushing marks the cart again
+        dirty = self.redis.srem(dirty_key, user_id)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hgetall(items_key)
+            pipe.hmget(meta_key, "id", "version")
+            quantities, (cart_id, version) = pipe.execute()
+            if cart_id is None:
+                return None  # Expired, nothing left to write
+            quantities = {int(product_id): int(quantity) for product_id, quantity in quantities.items()}
+            snapshot = quantities, int(version or 0)
+            if not dirty:
+                return snapshot
+            # Lines of products deleted since they were added are dropped
+            product_ids = Product.objects.filter(pk__in=quantities).values_list("pk", flat=True)
+            lines = [
+                CartItem(cart_id=int(cart_id), product_id=product_id, quantity=quantities[product_id])
+                for product_id in product_ids
+            ]
+            with transaction.atomic():
+                touch(Cart.objects.filter(pk=int(cart_id)))
+                CartItem.objects.filter(cart_id=int(cart_id)).exclude(
+                    product_id__in=[line.product_id for line in lines]
+                ).delete()
+                CartItem.objects.bulk_create(
+                    lines,
+                    update_conflicts=True,
+                    unique_fields=["cart", "product"],
+                    update_fields=["quantity"],
+                )
+            return snapshot
+        except Exception:
+            if dirty:
+                self.redis.sadd(dirty_key, user_id)
+            raise
+
+
+@lru_cache(maxsize=None)
+def get_cart_backend():
+    """The backend named by ``settings.CART_BACKEND``."""
+    return import_string(settings.CART_BACKEND)()
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cart.cleanup import CLEANUP_BATCH_SIZE, delete_abandoned_carts
+
+
+class Command(BaseCommand):
+    help = "Delete carts (with their items and stock holds) untouched for a number of days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CART_ABANDONED_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=CLEANUP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            self.stdout.write(
+                f"batch {stats['batches']}: {stats['carts']} carts, {stats['items']} items "
+                f"({stats['rows_per_sec']} rows/sec)"
+            )
+
+        stats = delete_abandoned_carts(options["days"], options["batch_size"], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['carts']} carts and {stats['items']} items deleted in {stats['seconds']}s "
+            f"({stats['rows_per_sec']} rows/sec)"
+        ))
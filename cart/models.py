@@ -10,17 +10,32 @@ class Cart(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cart"
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Last change to the cart's lines; abandoned carts are cleaned up by cart.cleanup
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="cart_updated_id_idx"),
+        ]
 
     def __str__(self):
         return f"Cart of {self.user.email}"
 
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.totals()[0]
 
     @property
     def total_price(self):
-        return sum(item.product.price * item.quantity for item in self.items.all())
+        return self.totals()[1]
+
+    def totals(self):
+        """``(total_items, total_price)`` in one pass over the (prefetched) items."""
+        total_items = total_price = 0
+        for item in self.items.all():
+            total_items += item.quantity
+            total_price += item.product.price * item.quantity
+        return total_items, total_price
 
 
 class CartItem(models.Model):
@@ -33,3 +48,24 @@ class CartItem(models.Model):
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
+
+
+class StockReservation(models.Model):
+    """
+    Units of a product held for a cart until ``expires_at``. Each hold is
+    also counted in ``Product.reserved``; both are changed together by
+    ``cart.reservations``.
+    """
+
+    cart = models.ForeignKey(Cart, related_name="reservations", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="reservations", on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="unique_cart_product_reservation"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held for cart {self.cart_id}"
@@ -0,0 +1,123 @@
+"""
+Time-limited stock holds for carts (``settings.CART_RESERVATIONS``).
+
+A hold is a ``StockReservation`` row plus the same units counted in
+``Product.reserved``, so available-to-sell is ``stock - reserved`` read off
+the product row. Both change together in one statement. Hold rows are
+locked before their product rows (by release, the expiry sweep and
+checkout alike) and product rows in id order, so concurrent carts,
+checkouts and sweeps cannot deadlock.
+"""
+from django.conf import settings
+from django.db import connection
+
+EXPIRE_BATCH_SIZE = 1000
+
+# Holds ``quantity`` more units of each listed product for a cart, for those
+# that have them available; returns the product ids that were held
+_RESERVE_SQL = """
+WITH wanted (product_id, quantity) AS (VALUES {values}),
+locked AS (
+    SELECT id FROM catalog_product
+    WHERE id IN (SELECT product_id FROM wanted)
+    ORDER BY id
+    FOR UPDATE
+),
+held AS (
+    UPDATE catalog_product AS product
+    SET reserved = product.reserved + wanted.quantity
+    FROM wanted JOIN locked ON locked.id = wanted.product_id
+    WHERE product.id = wanted.product_id AND product.stock - product.reserved >= wanted.quantity
+    RETURNING product.id, wanted.quantity
+)
+INSERT INTO cart_stockreservation (cart_id, product_id, quantity, expires_at)
+SELECT %s, id, quantity, now() + %s * interval '1 second' FROM held
+ON CONFLICT (cart_id, product_id) DO UPDATE
+SET quantity = cart_stockreservation.quantity + EXCLUDED.quantity, expires_at = EXCLUDED.expires_at
+RETURNING product_id
+"""
+
+# Drops the holds selected by ``{holds}`` (a query of reservation ids) and
+# gives their units back; returns one row of released units per product
+_RELEASE_SQL = """
+WITH released AS (
+    DELETE FROM cart_stockreservation WHERE id IN ({holds})
+    RETURNING product_id, quantity
+),
+totals AS (
+    SELECT product_id, SUM(quantity) AS quantity FROM released GROUP BY product_id
+),
+locked AS (
+    SELECT id FROM catalog_product
+    WHERE id IN (SELECT product_id FROM totals)
+    ORDER BY id
+    FOR UPDATE
+)
+UPDATE catalog_product AS product
+SET reserved = GREATEST(product.reserved - totals.quantity, 0)
+FROM totals JOIN locked ON locked.id = totals.product_id
+WHERE product.id = totals.product_id
+RETURNING totals.quantity
+"""
+
+_CART_HOLDS = "SELECT id FROM cart_stockreservation WHERE cart_id = %s"
+_CART_PRODUCT_HOLDS = _CART_HOLDS + " AND product_id = ANY(%s)"
+_CARTS_HOLDS = "SELECT id FROM cart_stockreservation WHERE cart_id = ANY(%s)"
+_EXPIRED_HOLDS = (
+    "SELECT id FROM cart_stockreservation WHERE expires_at <= now() "
+    "ORDER BY expires_at LIMIT %s FOR UPDATE SKIP LOCKED"
+)
+
+
+def reservations_enabled():
+    return settings.CART_RESERVATIONS
+
+
+def reserve(cart_id, quantities):
+    """
+    Hold ``product id -> quantity`` more units for ``cart_id``, refreshing
+    each hold's expiry. Returns the product ids short of available stock,
+    which were not held; the caller rolls back if any matter.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    if not quantities:
+        return set()
+    values = ", ".join(["(%s::integer, %s::integer)"] * len(quantities))
+    params = [value for line in quantities.items() for value in line]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _RESERVE_SQL.format(values=values),
+            params + [cart_id, settings.CART_RESERVATION_TTL],
+        )
+        held = {row[0] for row in cursor.fetchall()}
+    return quantities.keys() - held
+
+
+def _release(holds, params):
+    with connection.cursor() as cursor:
+        cursor.execute(_RELEASE_SQL.format(holds=holds), params)
+        return sum(row[0] for row in cursor.fetchall())
+
+
+def release(cart_id, product_ids=None):
+    """Give back the units held for ``cart_id`` (only ``product_ids`` if given)."""
+    if product_ids is None:
+        return _release(_CART_HOLDS, [cart_id])
+    if not product_ids:
+        return 0
+    return _release(_CART_PRODUCT_HOLDS, [cart_id, list(product_ids)])
+
+
+def release_carts(cart_ids):
+    """Give back every unit held by the carts in ``cart_ids``."""
+    return _release(_CARTS_HOLDS, [list(cart_ids)]) if cart_ids else 0
+
+
+def expire_reservations(batch_size=EXPIRE_BATCH_SIZE):
+    """Release every expired hold, ``batch_size`` at a time; returns the units freed."""
+    freed = 0
+    while True:
+        units = _release(_EXPIRED_HOLDS, [batch_size])
+        if not units:
+            return freed
+        freed += units
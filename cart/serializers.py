@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
 from catalog.serializers import ProductSerializer
+from core.utils.sparse_fields import SparseFieldsMixin
 from .models import Cart, CartItem
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
     subtotal = serializers.SerializerMethodField()
@@ -12,6 +13,8 @@ class CartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
         fields = ["id", "product", "product_id", "quantity", "subtotal"]
+        expandable_fields = ("product",)
+        field_dependencies = {"subtotal": ("quantity", "product__price")}
 
     def get_subtotal(self, obj):
         return obj.product.price * obj.quantity
@@ -25,7 +28,7 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         fields = ["product_id", "quantity"]
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_items = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
@@ -35,8 +38,30 @@ class CartSerializer(serializers.ModelSerializer):
         fields = ["id", "user", "items", "total_items", "total_price", "created_at"]
         read_only_fields = ["user", "created_at"]
 
+    def to_representation(self, instance):
+        self._totals = instance.totals()
+        return super().to_representation(instance)
+
     def get_total_items(self, obj):
-        return sum(item.quantity for item in obj.items.all())
+        return self._totals[0]
 
     def get_total_price(self, obj):
-        return sum(item.product.price * item.quantity for item in obj.items.all())
+        return self._totals[1]
+
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["add", "set", "remove"])
+    product_id = serializers.IntegerField()
+    # add: units to add (default 1); set: new quantity, 0 removes the line
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] == "set" and "quantity" not in attrs:
+            raise serializers.ValidationError({"quantity": "This field is required for set."})
+        if attrs["op"] == "add" and attrs.get("quantity") == 0:
+            raise serializers.ValidationError({"quantity": "Ensure this value is greater than or equal to 1."})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
@@ -0,0 +1,24 @@
+from celery import shared_task
+
+from . import cleanup
+from .backends import get_cart_backend
+from .reservations import expire_reservations
+
+
+@shared_task(ignore_result=True)
+def flush_carts():
+    """Write carts changed since the last run to the cart tables (scheduled by beat)."""
+    return f"{get_cart_backend().flush_pending()} carts flushed"
+
+
+@shared_task(ignore_result=True)
+def expire_stock_reservations():
+    """Give the units of expired cart holds back to available stock (scheduled by beat)."""
+    return f"{expire_reservations()} units released"
+
+
+@shared_task(ignore_result=True)
+def delete_abandoned_carts():
+    """Delete carts untouched for CART_ABANDONED_AFTER_DAYS (scheduled by beat)."""
+    stats = cleanup.delete_abandoned_carts()
+    return f"{stats['carts']} carts, {stats['items']} items deleted ({stats['rows_per_sec']} rows/sec)"
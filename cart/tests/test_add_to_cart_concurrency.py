@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from django.db import connection
+from rest_framework import serializers
+
+from cart.backends import DatabaseCartBackend
+from cart.models import Cart, CartItem
+
+ADDERS = 16
+
+
+def add_in_parallel(user, product, batch=False):
+    """Fire ADDERS single-unit adds (or batches of one add) at once; returns how many were refused."""
+    backend = DatabaseCartBackend()
+    start = threading.Barrier(ADDERS)
+    refused = []
+
+    def add():
+        try:
+            start.wait()
+            if batch:
+                backend.apply(user, [{"op": "add", "product_id": product.pk, "quantity": 1}])
+            else:
+                backend.add_item(user, product.pk, 1)
+        except serializers.ValidationError:
+            refused.append(1)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=add) for _ in range(ADDERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(refused)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_adds_lose_no_increments(make_user, make_product):
+    user = make_user()
+    product = make_product(stock=100)
+
+    assert add_in_parallel(user, product) == 0
+    assert CartItem.objects.get(cart__user=user, product=product).quantity == ADDERS
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_adds_never_exceed_stock(make_user, make_product):
+    user = make_user()
+    product = make_product(stock=ADDERS // 2)
+
+    assert add_in_parallel(user, product) == ADDERS - ADDERS // 2
+    assert CartItem.objects.get(cart__user=user, product=product).quantity == ADDERS // 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_batches_creating_the_same_line_lose_no_increments(make_user, make_product):
+    user = make_user()
+    Cart.objects.create(user=user)
+    product = make_product(stock=100)
+
+    assert add_in_parallel(user, product, batch=True) == 0
+    assert CartItem.objects.get(cart__user=user, product=product).quantity == ADDERS
+
+
+@pytest.mark.django_db
+def test_add_is_a_single_statement(django_assert_num_queries, make_user, make_product):
+    user = make_user()
+    product = make_product(stock=10)
+    backend = DatabaseCartBackend()
+
+    # Creating the cart and the line, then adding to it: one round trip each
+    with django_assert_num_queries(1):
+        assert backend.add_item(user, product.pk, 1).quantity == 1
+    with django_assert_num_queries(1):
+        assert backend.add_item(user, product.pk, 2).quantity == 3
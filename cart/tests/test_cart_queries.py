@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cart.models import Cart, CartItem
+from catalog.models import Category, Product
+
+
+@pytest.fixture
+def make_cart(make_user, make_product):
+    def make(item_count):
+        user = make_user()
+        cart = Cart.objects.create(user=user)
+        categories = [Category.objects.create(name=f"Category {index}") for index in range(3)]
+        products = [
+            make_product(stock=100, price="2.50", category=categories[index % len(categories)])
+            for index in range(item_count)
+        ]
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=product, quantity=2) for product in products
+        )
+        return user
+
+    return make
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("item_count", [0, 1, 30])
+def test_cart_view_query_count_does_not_grow_with_items(item_count, make_cart, django_assert_num_queries):
+    client = APIClient()
+    client.force_authenticate(make_cart(item_count))
+
+    # The cart, then its items joined to products and categories
+    with django_assert_num_queries(2):
+        response = client.get(reverse("cart_detail"))
+
+    assert response.status_code == 200
+    assert len(response.data["items"]) == item_count
+    assert response.data["total_items"] == 2 * item_count
+    assert response.data["total_price"] == Decimal("5.00") * item_count
+    if item_count:
+        assert response.data["items"][0]["product"]["category"]["name"] == "Category 0"
+
+
+@pytest.mark.django_db
+def test_update_with_sparse_fields_still_writes_quantity(make_cart):
+    user = make_cart(1)
+    item = CartItem.objects.get(cart__user=user)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.patch(
+        f"{reverse('update_cart_item', args=[item.pk])}?fields=id", {"quantity": 5}, format="json"
+    )
+
+    assert response.status_code == 200, response.data
+    item.refresh_from_db()
+    assert item.quantity == 5
+
+
+@pytest.mark.django_db
+def test_batch_add_of_zero_is_refused(make_cart):
+    user = make_cart(1)
+    product = Product.objects.get()
+    client = APIClient()
+    client.force_authenticate(user)
+    operations = [{"op": "add", "product_id": product.pk, "quantity": 0}]
+
+    response = client.post(reverse("cart_batch"), {"operations": operations}, format="json")
+
+    assert response.status_code == 400
+    assert "quantity" in response.data["operations"][0]
+    assert CartItem.objects.get(cart__user=user).quantity == 2
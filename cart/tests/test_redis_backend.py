@@ -0,0 +1,112 @@
+import pytest
+from django.http import Http404
+from rest_framework import serializers
+
+from cart.backends import RedisCartBackend
+from cart.models import CartItem
+from catalog.models import Product
+from orders.checkout import CheckoutError, checkout
+from orders.models import OrderItem
+
+
+@pytest.fixture
+def backend(monkeypatch, settings):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # Lua scripting in fakeredis
+    server = fakeredis.FakeRedis()
+    monkeypatch.setattr("django_redis.get_redis_connection", lambda alias: server)
+    settings.CART_RESERVATIONS = False
+    return RedisCartBackend()
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def products(make_product):
+    return [make_product(stock=5) for _ in range(3)]
+
+
+def db_lines(user):
+    return dict(CartItem.objects.filter(cart__user=user).values_list("product_id", "quantity"))
+
+
+@pytest.mark.django_db
+def test_scripts_guard_stock_and_missing_lines(backend, user, products):
+    first, second, _ = products
+
+    assert backend.add_item(user, first.pk, 3).quantity == 3
+    with pytest.raises(serializers.ValidationError):
+        backend.add_item(user, first.pk, 3)
+    with pytest.raises(Http404):
+        backend.update_item(user, second.pk, 1)
+    backend.update_item(user, first.pk, 5)
+    backend.add_item(user, second.pk, 1)
+    backend.remove_item(user, second.pk)
+
+    assert [(item.product_id, item.quantity) for item in backend.get_cart(user).items.all()] == [(first.pk, 5)]
+
+
+@pytest.mark.django_db
+def test_flush_pending_writes_changed_carts_once(backend, user, products):
+    first, second, _ = products
+    backend.add_item(user, first.pk, 2)
+    backend.add_item(user, second.pk, 1)
+
+    assert backend.flush_pending() == 1
+    assert db_lines(user) == {first.pk: 2, second.pk: 1}
+
+    backend.remove_item(user, second.pk)
+    assert backend.flush_pending() == 1
+    assert backend.flush_pending() == 0
+    assert db_lines(user) == {first.pk: 2}
+
+
+@pytest.mark.django_db
+def test_checkout_drops_an_unchanged_live_cart(backend, user, products):
+    first, _, _ = products
+    backend.add_item(user, first.pk, 2)
+
+    with backend.checkout_session(user):
+        order = checkout(user, "1 Street", "card")
+
+    assert list(OrderItem.objects.filter(order=order).values_list("product_id", "quantity")) == [(first.pk, 2)]
+    assert backend.get_cart(user).items.all() == []
+    assert db_lines(user) == {}
+
+
+@pytest.mark.django_db
+def test_changes_made_during_checkout_are_kept(backend, user, products):
+    first, second, _ = products
+    backend.add_item(user, first.pk, 2)
+
+    with backend.checkout_session(user):
+        checkout(user, "1 Street", "card")
+        # Another request adds to the cart while the order is written
+        backend.add_item(user, first.pk, 1)
+        backend.add_item(user, second.pk, 1)
+        # The beat flush leaves the cart to the checkout holding its lock
+        assert backend.flush_pending() == 0
+
+    assert {item.product_id: item.quantity for item in backend.get_cart(user).items.all()} == {
+        first.pk: 1,
+        second.pk: 1,
+    }
+    assert backend.flush_pending() == 1
+    assert db_lines(user) == {first.pk: 1, second.pk: 1}
+
+
+@pytest.mark.django_db
+def test_failed_checkout_leaves_the_live_cart(backend, user, products):
+    first, _, _ = products
+    backend.add_item(user, first.pk, 2)
+    Product.objects.filter(pk=first.pk).update(stock=1)
+
+    with pytest.raises(CheckoutError, match="Not enough stock"):
+        with backend.checkout_session(user):
+            checkout(user, "1 Street", "card")
+
+    assert [(item.product_id, item.quantity) for item in backend.get_cart(user).items.all()] == [(first.pk, 2)]
+    assert db_lines(user) == {first.pk: 2}
@@ -0,0 +1,183 @@
+import datetime
+import threading
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+from rest_framework import serializers
+
+from cart.backends import DatabaseCartBackend
+from cart.models import Cart, CartItem, StockReservation
+from cart.reservations import expire_reservations, release, reserve
+from catalog.models import Product
+from orders.checkout import CheckoutError, checkout
+
+BUYERS = 8
+
+
+@pytest.fixture(autouse=True)
+def reservations(settings):
+    settings.CART_RESERVATIONS = True
+    settings.CART_RESERVATION_TTL = 900
+
+
+def held(cart_id):
+    return dict(StockReservation.objects.filter(cart_id=cart_id).values_list("product_id", "quantity"))
+
+
+def expire_all():
+    StockReservation.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+
+@pytest.mark.django_db
+def test_reserve_and_release_move_units_with_the_holds(make_user, make_product):
+    cart = Cart.objects.create(user=make_user())
+    widget, gadget = make_product(stock=5), make_product(stock=2)
+
+    assert reserve(cart.pk, {widget.pk: 2, gadget.pk: 3}) == {gadget.pk}
+    assert reserve(cart.pk, {widget.pk: 1}) == set()
+    assert held(cart.pk) == {widget.pk: 3}
+    widget.refresh_from_db()
+    assert (widget.reserved, widget.available) == (3, 2)
+
+    assert release(cart.pk, [gadget.pk]) == 0
+    assert release(cart.pk) == 3
+    widget.refresh_from_db()
+    assert widget.reserved == 0 and held(cart.pk) == {}
+
+
+@pytest.mark.django_db
+def test_expired_holds_are_swept_in_batches(make_user, make_product):
+    widget = make_product(stock=10)
+    carts = [Cart.objects.create(user=make_user()) for _ in range(3)]
+    for cart in carts:
+        reserve(cart.pk, {widget.pk: 2})
+    expire_all()
+    reserve(carts[0].pk, {widget.pk: 1})  # Refreshed, so no longer expired
+
+    assert expire_reservations(batch_size=1) == 4
+    widget.refresh_from_db()
+    assert widget.reserved == 3
+    assert list(StockReservation.objects.values_list("cart_id", flat=True)) == [carts[0].pk]
+
+
+@pytest.mark.django_db
+def test_short_hold_rolls_the_add_back(make_user, make_product):
+    widget = make_product(stock=3)
+    backend = DatabaseCartBackend()
+    backend.add_item(make_user(), widget.pk, 2)
+    shopper = make_user()
+
+    with pytest.raises(serializers.ValidationError):
+        backend.add_item(shopper, widget.pk, 2)
+
+    assert not CartItem.objects.filter(cart__user=shopper).exists()
+    assert not StockReservation.objects.filter(cart__user=shopper).exists()
+    widget.refresh_from_db()
+    assert widget.reserved == 2
+
+
+@pytest.mark.django_db
+def test_adding_to_a_line_holds_the_whole_line_again(make_user, make_product):
+    widget = make_product(stock=10)
+    user = make_user()
+    backend = DatabaseCartBackend()
+    item = backend.add_item(user, widget.pk, 2)
+    expire_all()
+    expire_reservations()
+
+    backend.add_item(user, widget.pk, 1)
+
+    assert held(item.cart_id) == {widget.pk: 3}
+    widget.refresh_from_db()
+    assert widget.reserved == 3
+
+
+@pytest.mark.django_db
+def test_checkout_counts_the_carts_own_holds(make_user, make_product):
+    widget = make_product(stock=2)
+    user = make_user()
+    item = DatabaseCartBackend().add_item(user, widget.pk, 2)
+
+    checkout(user, "1 Street", "card")
+
+    widget.refresh_from_db()
+    assert (widget.stock, widget.reserved) == (0, 0)
+    assert held(item.cart_id) == {}
+
+
+@pytest.mark.django_db
+def test_checkout_cannot_take_units_held_by_another_cart(make_user, make_product):
+    widget = make_product(stock=2)
+    DatabaseCartBackend().add_item(make_user(), widget.pk, 2)
+    buyer = make_user()
+    cart = Cart.objects.create(user=buyer)
+    CartItem.objects.create(cart=cart, product=widget, quantity=1)
+
+    with pytest.raises(CheckoutError):
+        checkout(buyer, "1 Street", "card")
+
+    widget.refresh_from_db()
+    assert (widget.stock, widget.reserved) == (2, 2)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_competing_carts_never_hold_more_than_stock(make_user, make_product):
+    widget = make_product(stock=BUYERS // 2)
+    users = [make_user() for _ in range(BUYERS)]
+    backend = DatabaseCartBackend()
+    start = threading.Barrier(BUYERS)
+    refused = []
+
+    def add(user):
+        try:
+            start.wait()
+            backend.add_item(user, widget.pk, 1)
+        except serializers.ValidationError:
+            refused.append(1)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=add, args=[user]) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    widget.refresh_from_db()
+    assert len(refused) == BUYERS - BUYERS // 2
+    assert widget.reserved == BUYERS // 2
+    assert StockReservation.objects.count() == CartItem.objects.count() == BUYERS // 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_expiry_sweep_skips_the_holds_of_a_checkout_in_progress(monkeypatch, make_user, make_product):
+    widget = make_product(stock=5)
+    user = make_user()
+    item = DatabaseCartBackend().add_item(user, widget.pk, 2)
+    expire_all()
+    locked, resume = threading.Event(), threading.Event()
+
+    def paused_now():
+        # Checkout reads the clock with its holds and products locked
+        locked.set()
+        resume.wait(5)
+        return timezone.now()
+
+    monkeypatch.setattr("orders.checkout.timezone", type("Clock", (), {"now": staticmethod(paused_now)}))
+    buyer = threading.Thread(target=lambda: (checkout(user, "1 Street", "card"), connection.close()))
+    buyer.start()
+    assert locked.wait(5)
+    swept = []
+    sweeper = threading.Thread(target=lambda: (swept.append(expire_reservations()), connection.close()))
+    sweeper.start()
+    # Holds locked before products: the sweep skips them rather than waiting on the products
+    sweeper.join(2)
+    resume.set()
+    buyer.join()
+    sweeper.join()
+
+    assert swept == [0]
+    assert held(item.cart_id) == {}
+    widget.refresh_from_db()
+    assert (widget.stock, widget.reserved) == (3, 0)
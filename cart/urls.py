@@ -6,6 +6,7 @@ from .views import (
     UpdateCartItemView,
     RemoveFromCartView,
     ClearCartView,
+    CartBatchView,
 )
 
 urlpatterns = [
@@ -14,4 +15,5 @@ urlpatterns = [
     path("update/<int:pk>/", UpdateCartItemView.as_view(), name="update_cart_item"),
     path("remove/<int:pk>/", RemoveFromCartView.as_view(), name="remove_from_cart"),
     path("clear/", ClearCartView.as_view(), name="clear_cart"),
+    path("batch/", CartBatchView.as_view(), name="cart_batch"),
 ]
@@ -1,11 +1,15 @@
-from django.shortcuts import get_object_or_404
+from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from catalog.models import Product
-from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer, AddCartItemSerializer
+from .backends import get_cart_backend
+from .serializers import (
+    AddCartItemSerializer,
+    CartBatchSerializer,
+    CartItemSerializer,
+    CartSerializer,
+)
 
 
 # Create your views here.
@@ -14,8 +18,7 @@ class CartView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        return get_cart_backend().get_cart(self.request.user)
 
 
 class AddToCartView(generics.CreateAPIView):
@@ -23,45 +26,58 @@ class AddToCartView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
-        product_id = self.request.data.get("product_id")
-        quantity = self.request.data.get("quantity", 1)
-
-        product = get_object_or_404(Product, id=product_id)
-
-        # Validate stock
-        if product.stock < quantity:
-            raise serializers.ValidationError("Not enough stock available.")
-
-        item, created = CartItem.objects.get_or_create(
-            cart=cart, product=product, defaults={"quantity": quantity}
+        return get_cart_backend().add_item(
+            self.request.user,
+            serializer.validated_data["product_id"],
+            serializer.validated_data.get("quantity", 1),
         )
-        if not created:
-            if product.stock < item.quantity + quantity:
-                raise serializers.ValidationError("Not enough stock available.")
-            item.quantity += quantity
-            item.save()
-        return item
 
 
 class UpdateCartItemView(generics.UpdateAPIView):
-    queryset = CartItem.objects.all()
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def update(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, partial=kwargs.get("partial", False))
+        serializer.is_valid(raise_exception=True)
+        if "quantity" not in serializer.validated_data:
+            raise serializers.ValidationError({"quantity": ["This field is required."]})
+        item = get_cart_backend().update_item(
+            request.user, self.kwargs["pk"], serializer.validated_data["quantity"]
+        )
+        return Response(self.get_serializer(item).data)
+
 
 class RemoveFromCartView(generics.DestroyAPIView):
-    queryset = CartItem.objects.all()
     serializer_class = CartItemSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def destroy(self, request, *args, **kwargs):
+        get_cart_backend().remove_item(request.user, self.kwargs["pk"])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CartBatchView(APIView):
+    """
+    Apply a list of ``add``/``set``/``remove`` operations (by product id)
+    atomically and return the updated cart: a whole cart edit in one round trip.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    @swagger_auto_schema(request_body=CartBatchSerializer, responses={200: CartSerializer})
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart = get_cart_backend().apply(request.user, serializer.validated_data["operations"])
+        return Response(CartSerializer(cart, context={"request": request}).data)
+
 
 class ClearCartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def delete(self, request, *args, **kwargs):
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        cart.items.all().delete()
+        get_cart_backend().clear(request.user)
         return Response(
             {"detail": "Cart cleared successfully."}, status=status.HTTP_204_NO_CONTENT
         )
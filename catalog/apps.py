@@ -6,12 +6,35 @@ class CatalogConfig(AppConfig):
     name = 'catalog'
 
     def ready(self):
-        from .models import Product
+        from .models import Category, Product
         from core.utils.cache_signals import register_cache_invalidation
 
         # Automatically invalidate cache for products
         register_cache_invalidation(
             Product,
             list_cache_key_prefix="products_list",
-            detail_cache_key_prefix="product_detail"
+            detail_cache_key_prefix="product_detail",
+            # Orders nest their items' products
+            related_cache_key_prefixes=(
+                "products_suggest",
+                "products_facets",
+                "products_related",
+                "orders_list",
+                "order_detail",
+            ),
+        )
+
+        # Products nest their category, so category edits retire product
+        # caches too, and those of the orders nesting the products
+        register_cache_invalidation(
+            Category,
+            list_cache_key_prefix="categories_list",
+            related_cache_key_prefixes=(
+                "categories_tree",
+                "products_list",
+                "product_detail",
+                "products_facets",
+                "orders_list",
+                "order_detail",
+            ),
         )
@@ -0,0 +1,45 @@
+from django.db.models import Count, Q
+
+# Upper bound of each price bucket; anything above the last edge lands in "<last>+"
+PRICE_FACET_EDGES = [25, 50, 100, 250, 500, 1000]
+
+
+def category_facet(queryset):
+    """Product counts per category, as one GROUP BY."""
+    rows = (
+        queryset.order_by()
+        .values("category_id", "category__name")
+        .annotate(count=Count("id"))
+        .order_by("-count", "category__name")
+    )
+    return [
+        {"id": row["category_id"], "name": row["category__name"], "count": row["count"]}
+        for row in rows
+    ]
+
+
+def price_facet(queryset, edges=PRICE_FACET_EDGES):
+    """Product counts per price bucket, as one conditional aggregation."""
+    bounds = list(zip([0] + edges, edges + [None]))
+    aggregates = {
+        f"bucket_{index}": Count(
+            "id", filter=Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q())
+        )
+        for index, (low, high) in enumerate(bounds)
+    }
+    counts = queryset.order_by().aggregate(**aggregates)
+    return [
+        {
+            "range": f"{low}-{high}" if high is not None else f"{low}+",
+            "min": low,
+            "max": high,
+            "count": counts[f"bucket_{index}"],
+        }
+        for index, (low, high) in enumerate(bounds)
+    ]
+
+
+FACETS = {
+    "category": category_facet,
+    "price": price_facet,
+}
@@ -0,0 +1,61 @@
+import re
+
+import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from rest_framework import filters
+
+from .models import Category, Product
+
+SEARCH_CONFIG = "english"
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text product search on ``?q=`` backed by the ``search_vector`` GIN index.
+
+    Every term is prefix-matched (``lapt`` finds ``laptop``) and all terms must
+    match. Results are ranked with name hits above description hits unless the
+    client asks for an explicit ``?ordering=``, so this backend must run after
+    ``OrderingFilter``.
+    """
+
+    search_param = "q"
+
+    def get_search_terms(self, request):
+        # Keep word characters only, so user input can never break the tsquery syntax
+        return re.findall(r"\w+", request.query_params.get(self.search_param, ""))
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms),
+            search_type="raw",
+            config=SEARCH_CONFIG,
+        )
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F("search_vector"), query)
+        )
+        if request.query_params.get(filters.OrderingFilter.ordering_param):
+            return queryset
+        return queryset.order_by("-search_rank", "-created_at", "id")
+
+
+class ProductFilter(django_filters.FilterSet):
+    category_tree = django_filters.NumberFilter(
+        method="filter_category_tree", label="Category id, including all its subcategories"
+    )
+
+    class Meta:
+        model = Product
+        fields = ["category__id", "price"]
+
+    def filter_category_tree(self, queryset, name, value):
+        path = Category.objects.filter(pk=value).values_list("path", flat=True).first()
+        if path is None:
+            return queryset.none()
+        # A constant prefix lets Postgres answer this from the path index at any depth
+        return queryset.filter(category__path__startswith=path)
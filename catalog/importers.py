@@ -0,0 +1,193 @@
+import csv
+import json
+import time
+import uuid
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+from core.utils.cache_utils import invalidate_cache
+from .models import Category, Product
+
+IMPORT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+UPSERT_FIELDS = ["name", "description", "price", "stock", "category", "updated_at"]
+# File extension -> import format
+IMPORT_FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+# Column limits, checked per row so one bad value cannot fail a whole batch
+NAME_MAX_LENGTH = Product._meta.get_field("name").max_length
+SLUG_MAX_LENGTH = Product._meta.get_field("slug").max_length
+PRICE_DECIMAL_PLACES = Product._meta.get_field("price").decimal_places
+PRICE_LIMIT = Decimal(10) ** (Product._meta.get_field("price").max_digits - PRICE_DECIMAL_PLACES)
+STOCK_MAX = 2147483647
+# Room left in a generated slug for a "-<8 hex>" uniqueness suffix
+SLUG_SUFFIX_LENGTH = 9
+
+
+def read_rows(stream, file_format):
+    """
+    Lazily yield product rows from a text stream of CSV (with a header line)
+    or NDJSON (one object per line), so memory stays flat for any file size.
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+    elif file_format == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def import_products(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Upsert products from an iterable of dicts with ``name``, ``price``,
+    ``category`` (slug or name) and optional ``slug``, ``description`` and
+    ``stock`` keys.
+
+    Rows carrying a ``slug`` are upserted on it, so re-running a feed updates
+    in place; rows without one get a fresh unique slug. Each batch resolves
+    its categories and slugs in bulk and is written with one
+    ``INSERT ... ON CONFLICT (slug) DO UPDATE``. Signals do not fire per row:
+    product caches are invalidated once at the end.
+    """
+    stats = {"rows": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+    started = time.perf_counter()
+    rows = iter(rows)
+    line = 1
+    try:
+        while batch := list(islice(rows, batch_size)):
+            _import_batch(batch, line, stats)
+            line += len(batch)
+    finally:
+        # Batches committed before a failure are live too
+        invalidate_cache(
+            "products_list",
+            "product_detail",
+            "products_suggest",
+            "products_facets",
+            "products_related",
+            "orders_list",
+            "order_detail",
+        )
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["rows"] / elapsed) if elapsed else stats["rows"]
+    return stats
+
+
+def _error(stats, line, message):
+    stats["failed"] += 1
+    if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+        stats["errors"].append({"row": line, "error": message})
+
+
+def _clean_row(row):
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("name is required")
+    if len(name) > NAME_MAX_LENGTH:
+        raise ValueError(f"name must be at most {NAME_MAX_LENGTH} characters")
+    slug = slugify(row.get("slug") or "")
+    if len(slug) > SLUG_MAX_LENGTH:
+        raise ValueError(f"slug must be at most {SLUG_MAX_LENGTH} characters")
+    try:
+        price = Decimal(str(row.get("price")))
+    except (InvalidOperation, TypeError):
+        raise ValueError("price must be a number")
+    if not price.is_finite() or price < 0:
+        raise ValueError("price must be a non-negative number")
+    if price >= PRICE_LIMIT:
+        raise ValueError(f"price must be less than {PRICE_LIMIT}")
+    if price != price.quantize(Decimal(1).scaleb(-PRICE_DECIMAL_PLACES)):
+        raise ValueError(f"price must have at most {PRICE_DECIMAL_PLACES} decimal places")
+    try:
+        stock = int(row.get("stock") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("stock must be an integer")
+    if not 0 <= stock <= STOCK_MAX:
+        raise ValueError(f"stock must be between 0 and {STOCK_MAX}")
+    category = str(row.get("category") or "").strip()
+    if not category:
+        raise ValueError("category is required")
+    return {
+        "name": name,
+        "slug": slug,
+        "description": row.get("description") or "",
+        "price": price,
+        "stock": stock,
+        "category": category,
+    }
+
+
+def _import_batch(batch, first_line, stats):
+    cleaned = []
+    for line, row in enumerate(batch, start=first_line):
+        stats["rows"] += 1
+        try:
+            cleaned.append((line, _clean_row(row)))
+        except ValueError as exc:
+            _error(stats, line, str(exc))
+
+    # Resolve every category reference of the batch in one query
+    refs = {row["category"] for _, row in cleaned}
+    categories = {}
+    for category in Category.objects.filter(Q(slug__in=refs) | Q(name__in=refs)):
+        categories[category.slug] = category
+        categories.setdefault(category.name, category)
+
+    # One query for every slug the batch may collide with
+    bases = {row["slug"] or _slug_base(row["name"]) for _, row in cleaned}
+    taken = set(Product.objects.filter(slug__in=bases).values_list("slug", flat=True))
+    existing = set(taken)
+
+    products = {}
+    for line, row in cleaned:
+        category = categories.get(row["category"])
+        if category is None:
+            _error(stats, line, f"Unknown category: {row['category']}")
+            continue
+        slug = row["slug"]
+        if not slug:
+            slug = _unique_slug(_slug_base(row["name"]), taken)
+        taken.add(slug)
+        # Explicit slugs repeated within a batch: the last row wins
+        products[slug] = Product(
+            name=row["name"],
+            slug=slug,
+            description=row["description"],
+            price=row["price"],
+            stock=row["stock"],
+            category=category,
+        )
+
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products.values(),
+            update_conflicts=True,
+            unique_fields=["slug"],
+            update_fields=UPSERT_FIELDS,
+        )
+    updated = len(existing & products.keys())
+    stats["updated"] += updated
+    stats["created"] += len(products) - updated
+
+
+def _slug_base(name):
+    return slugify(name)[: SLUG_MAX_LENGTH - SLUG_SUFFIX_LENGTH].rstrip("-") or "product"
+
+
+def _unique_slug(base, taken):
+    if base not in taken:
+        return base
+    candidates = [f"{base}-{n}" for n in range(2, 12)]
+    taken.update(Product.objects.filter(slug__in=candidates).values_list("slug", flat=True))
+    for candidate in candidates:
+        if candidate not in taken:
+            return candidate
+    return f"{base}-{uuid.uuid4().hex[:8]}"
@@ -0,0 +1,93 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from catalog.filters import ProductSearchFilter
+from catalog.models import Category, Product
+from catalog.views import ProductListCreateView
+
+WORDS = [
+    "laptop", "phone", "camera", "wireless", "charger", "leather", "wallet",
+    "cotton", "shirt", "running", "shoes", "kitchen", "blender", "coffee",
+    "grinder", "garden", "hose", "travel", "backpack", "gaming", "mouse",
+    "keyboard", "monitor", "desk", "lamp", "steel", "bottle", "yoga", "mat",
+    "organic", "tea", "vintage", "watch", "portable", "speaker", "bluetooth",
+]
+
+BENCH_CATEGORY = "Search benchmark"
+
+
+class Command(BaseCommand):
+    help = "Compare ?q= full-text search with the ILIKE-based ?search= path on synthetic products."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=2_000_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--queries", nargs="+", default=["laptop", "wireless charger", "vint", "yoga mat"]
+        )
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic rows afterwards")
+
+    def handle(self, *args, **options):
+        category, _ = Category.objects.get_or_create(name=BENCH_CATEGORY)
+        existing = Product.objects.filter(category=category).count()
+        if existing < options["products"]:
+            self.seed(category, existing, options["products"])
+
+        try:
+            self.stdout.write(f"{'query':<20} {'search= (ms)':>14} {'q= (ms)':>10} {'hits':>10}")
+            for term in options["queries"]:
+                ilike = self.time_backend(filters.SearchFilter(), "search", term, options["repeat"])
+                fts = self.time_backend(ProductSearchFilter(), "q", term, options["repeat"])
+                self.stdout.write(f"{term:<20} {ilike[0]:>14.1f} {fts[0]:>10.1f} {fts[1]:>10}")
+        finally:
+            if not options["keep"]:
+                with connection.cursor() as cursor:
+                    cursor.execute("DELETE FROM catalog_product WHERE category_id = %s", [category.pk])
+                category.delete()
+
+    def seed(self, category, start, total):
+        self.stdout.write(f"Seeding {total - start} synthetic products...")
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO catalog_product
+                    (name, slug, description, price, stock, reserved, popularity, category_id, created_at, updated_at)
+                SELECT
+                    initcap(w[1 + mod(i, n)] || ' ' || w[1 + mod(i / n, n)] || ' ' || w[1 + mod(i / (n * n), n)]),
+                    'bench-' || i,
+                    'A ' || w[1 + mod(i * 7, n)] || ' ' || w[1 + mod(i * 13, n)]
+                        || ' for every ' || w[1 + mod(i * 17, n)],
+                    mod(i, 50000) / 100.0 + 1,
+                    mod(i, 100),
+                    0,
+                    0,
+                    %s,
+                    now(),
+                    now()
+                FROM generate_series(%s, %s - 1) AS i,
+                     (SELECT %s::text[] AS w, %s AS n) AS vocab
+                """,
+                [category.pk, start, total, WORDS, len(WORDS)],
+            )
+            cursor.execute("ANALYZE catalog_product")
+        self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    def time_backend(self, backend, param, term, repeat):
+        """Median time of the count + first page query pair the list view runs."""
+        view = ProductListCreateView()
+        request = Request(APIRequestFactory().get("/api/catalog/products/", {param: term}))
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset = backend.filter_queryset(request, Product.objects.all(), view)
+            hits = queryset.count()
+            list(queryset[:10])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), hits
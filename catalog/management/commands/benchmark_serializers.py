@@ -0,0 +1,113 @@
+import datetime
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from catalog.models import Category, Product
+from catalog.serializers import CategorySerializer, ProductSerializer
+from orders.models import Order, OrderItem
+from orders.serializers import OrderItemSerializer, OrderSerializer
+
+ITEMS_PER_ORDER = 3
+
+
+# Same fields, DRF's stock per-field to_representation all the way down
+class StockCategorySerializer(CategorySerializer):
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+class StockProductSerializer(ProductSerializer):
+    category = StockCategorySerializer(read_only=True)
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+class StockOrderItemSerializer(OrderItemSerializer):
+    product = StockProductSerializer(read_only=True)
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+class StockOrderSerializer(OrderSerializer):
+    items = StockOrderItemSerializer(many=True, read_only=True)
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+def build_products(count):
+    now = timezone.now()
+    categories = [
+        Category(id=index, name=f"Category {index}", slug=f"category-{index}", parent_id=None)
+        for index in range(1, 11)
+    ]
+    return [
+        Product(
+            id=index,
+            name=f"Product {index}",
+            slug=f"product-{index}",
+            description="Lorem ipsum dolor sit amet. " * 10,
+            price=Decimal(index % 500) + Decimal("0.99"),
+            stock=index % 40,
+            category=categories[index % len(categories)],
+            created_at=now - datetime.timedelta(minutes=index),
+            updated_at=now,
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def build_orders(count):
+    now = timezone.now()
+    products = build_products(count * ITEMS_PER_ORDER)
+    orders = []
+    for index in range(1, count + 1):
+        order = Order(
+            id=index, user_id=1, status="pending", shipping_address="1 Main St",
+            payment_method="card", total_price=Decimal("99.99"),
+            created_at=now, updated_at=now,
+        )
+        # Stands in for prefetch_related("items__product")
+        order._prefetched_objects_cache = {"items": [
+            OrderItem(id=index * 10 + line, order=order, product=product,
+                      quantity=line + 1, price=product.price)
+            for line, product in enumerate(products[(index - 1) * ITEMS_PER_ORDER:index * ITEMS_PER_ORDER])
+        ]}
+        orders.append(order)
+    return orders
+
+
+class Command(BaseCommand):
+    help = "Compare the compiled read path of the product/order serializers with stock DRF."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        cases = [
+            ("products", build_products, StockProductSerializer, ProductSerializer),
+            ("orders", build_orders, StockOrderSerializer, OrderSerializer),
+        ]
+        renderer = JSONRenderer()
+        self.stdout.write(f"{'serializer':<10} {'rows':>6} {'stock (ms)':>12} {'compiled (ms)':>14} {'speedup':>8}")
+        for label, build, stock_class, compiled_class in cases:
+            for rows in options["rows"]:
+                objects = build(rows)
+                stock = renderer.render(stock_class(objects, many=True).data)
+                compiled = renderer.render(compiled_class(objects, many=True).data)
+                if stock != compiled:
+                    raise CommandError(f"{label}: compiled output differs from stock DRF at {rows} rows")
+
+                number = max(1, 1000 // rows)
+                stock_ms, compiled_ms = (
+                    min(timeit.repeat(
+                        lambda: serializer_class(objects, many=True).data,
+                        number=number, repeat=options["repeat"],
+                    )) / number * 1000
+                    for serializer_class in (stock_class, compiled_class)
+                )
+                self.stdout.write(
+                    f"{label:<10} {rows:>6} {stock_ms:>12.3f} {compiled_ms:>14.3f} "
+                    f"{stock_ms / compiled_ms:>7.1f}x"
+                )
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.recommendations import RECOMMENDATIONS_PER_PRODUCT, update_recommendations
+
+
+class Command(BaseCommand):
+    help = "Update \"frequently bought together\" recommendations from paid orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rescore every product from scratch")
+        parser.add_argument("--top-k", type=int, default=RECOMMENDATIONS_PER_PRODUCT)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        run = update_recommendations(full=options["full"], top_k=options["top_k"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Full rebuild' if run.full_rebuild else 'Incremental update'} up to "
+            f"{run.paid_until:%Y-%m-%d %H:%M:%S}: {run.orders} orders, {run.products} products "
+            f"rescored in {time.perf_counter() - started:.2f}s"
+        ))
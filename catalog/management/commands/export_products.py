@@ -0,0 +1,9 @@
+from catalog.models import Product
+from catalog.views import ProductExportView
+from core.utils.export import ExportCommand
+
+
+class Command(ExportCommand):
+    help = "Stream the product catalog to CSV or NDJSON."
+    model = Product
+    columns = ProductExportView.columns
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importers import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk upsert products from a CSV or NDJSON file (use '-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--file-format", choices=sorted(set(IMPORT_FORMATS.values())),
+            help="Defaults to the file extension",
+        )
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["file_format"] or IMPORT_FORMATS.get(Path(path).suffix.lower())
+        if file_format is None:
+            raise CommandError("Cannot tell the format from the file name, pass --file-format.")
+
+        if path == "-":
+            stats = import_products(read_rows(sys.stdin, file_format), options["batch_size"])
+        else:
+            try:
+                with open(path, newline="", encoding="utf-8") as stream:
+                    stats = import_products(read_rows(stream, file_format), options["batch_size"])
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for error in stats["errors"]:
+            self.stderr.write(f"row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['rows']} rows in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec): "
+            f"{stats['created']} created, {stats['updated']} updated, {stats['failed']} failed"
+        ))
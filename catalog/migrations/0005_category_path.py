@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:12
+
+from django.db import migrations, models
+
+
+def build_paths(apps, schema_editor):
+    Category = apps.get_model("catalog", "Category")
+    children = {}
+    for category in Category.objects.only("id", "parent_id"):
+        children.setdefault(category.parent_id, []).append(category)
+
+    updated = []
+    stack = [(root, "") for root in children.get(None, [])]
+    while stack:
+        category, parent_path = stack.pop()
+        category.path = f"{parent_path}{category.pk}/"
+        updated.append(category)
+        stack.extend((child, category.path) for child in children.get(category.pk, []))
+    Category.objects.bulk_update(updated, ["path"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="path",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
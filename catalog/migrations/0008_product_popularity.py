@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:27
+
+import datetime
+
+from django.db import migrations, models
+
+# Frozen copy of catalog.popularity's scale as of this migration
+POPULARITY_HALF_LIFE = datetime.timedelta(days=30)
+POPULARITY_EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def popularity_weight(when):
+    return 2.0 ** ((when - POPULARITY_EPOCH) / POPULARITY_HALF_LIFE)
+
+
+def backfill_popularity(apps, schema_editor):
+    # Replay every paid, not cancelled order at its payment time
+    OrderItem = apps.get_model("orders", "OrderItem")
+    Product = apps.get_model("catalog", "Product")
+    scores = {}
+    items = OrderItem.objects.filter(order__paid_at__isnull=False).exclude(
+        order__status="cancelled"
+    ).values_list("product_id", "quantity", "order__paid_at")
+    for product_id, quantity, paid_at in items.iterator(chunk_size=10000):
+        scores[product_id] = scores.get(product_id, 0.0) + quantity * popularity_weight(paid_at)
+    Product.objects.bulk_update(
+        [Product(pk=product_id, popularity=score) for product_id, score in scores.items()],
+        ["popularity"],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0007_product_recommendations"),
+        ("orders", "0005_order_paid_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="popularity",
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["popularity", "id"], name="product_popularity_id_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Collate, Concat, Substr, Upper
 from django.utils.text import slugify
 
 
@@ -14,29 +18,99 @@ class Category(models.Model):
         null=True,
     )
 
+    # Materialized path of ancestor ids, e.g. "1/5/12/"; a subtree is one prefix scan
+    path = models.CharField(max_length=255, db_index=True, editable=False, default="")
+
     class Meta:
         verbose_name_plural = "Categories"
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        parent_path = ""
+        if self.parent_id:
+            parent_path = Category.objects.values_list("path", flat=True).get(pk=self.parent_id)
+        if self.path and parent_path.startswith(self.path):
+            raise ValueError("A category cannot be moved under its own subtree.")
         super().save(*args, **kwargs)
+        self._sync_path(parent_path)
+
+    def _sync_path(self, parent_path):
+        old_path, new_path = self.path, f"{parent_path}{self.pk}/"
+        if new_path == old_path:
+            return
+        Category.objects.filter(pk=self.pk).update(path=new_path)
+        if old_path:
+            # Re-root every descendant in a single statement
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr("path", len(old_path) + 1))
+            )
+        self.path = new_path
+
+    def get_descendants(self, include_self=True):
+        descendants = Category.objects.filter(path__startswith=self.path)
+        return descendants if include_self else descendants.exclude(pk=self.pk)
 
     def __str__(self):
         return self.name
 
 
+# Name hits rank above description hits
+PRODUCT_SEARCH_VECTOR = SearchVector("name", weight="A", config="english") + SearchVector(
+    "description", weight="B", config="english"
+)
+
+# Case-folded name in byte order: one btree serves both ``LIKE 'PREFIX%'``
+# and ``ORDER BY`` for autocomplete, whatever the database collation
+PRODUCT_NAME_KEY = Collate(Upper("name"), "C")
+
+
+class ProductManager(models.Manager):
+    def get_queryset(self):
+        # search_vector is only read inside Postgres, never load it into Python
+        return super().get_queryset().defer("search_vector")
+
+
 class Product(models.Model):
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Units held by live cart reservations (cart.reservations), part of stock
+    reserved = models.PositiveIntegerField(default=0, editable=False)
     category = models.ForeignKey(
         Category, related_name="products", on_delete=models.CASCADE
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Forward-decayed units sold, maintained by catalog.popularity
+    popularity = models.FloatField(default=0, editable=False)
+    # Maintained by Postgres on every write, including bulk ones
+    search_vector = models.GeneratedField(
+        expression=PRODUCT_SEARCH_VECTOR,
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = ProductManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            models.Index(PRODUCT_NAME_KEY, name="product_name_prefix_idx"),
+            GistIndex(
+                OpClass(Upper("name"), name="gist_trgm_ops"),
+                name="product_name_trgm_idx",
+            ),
+            # Keyset pagination: one (ordering field, id) index per ordering_fields entry
+            models.Index(fields=["created_at", "id"], name="product_created_id_idx"),
+            models.Index(fields=["price", "id"], name="product_price_id_idx"),
+            models.Index(fields=["name", "id"], name="product_name_id_idx"),
+            models.Index(fields=["popularity", "id"], name="product_popularity_id_idx"),
+            # Incremental exports (?since=)
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -45,3 +119,42 @@ class Product(models.Model):
 
     def __str__(self):
         return self.name
+
+    @property
+    def available(self):
+        """Units that can still be sold: stock not held by a cart reservation."""
+        return max(self.stock - self.reserved, 0)
+
+
+class ProductRecommendation(models.Model):
+    """
+    One of a product's top-K "frequently bought together" neighbours, ranked
+    by the number of paid orders containing both. Rebuilt by
+    ``catalog.recommendations``; read with one lookup on ``(product, rank)``.
+    """
+
+    product = models.ForeignKey(Product, related_name="recommendations", on_delete=models.CASCADE)
+    related = models.ForeignKey(Product, related_name="+", on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "rank"], name="product_recommendation_rank_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.score})"
+
+
+class RecommendationRun(models.Model):
+    """A recommendations batch; the latest ``paid_until`` is where the next one resumes."""
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    paid_until = models.DateTimeField()
+    full_rebuild = models.BooleanField(default=False)
+    orders = models.PositiveIntegerField(default=0)
+    products = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Recommendations up to {self.paid_until:%Y-%m-%d %H:%M}"
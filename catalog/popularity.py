@@ -0,0 +1,47 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from core.utils.cache_utils import invalidate_cache
+from .models import Product
+
+# Sales lose half their weight every 30 days
+POPULARITY_HALF_LIFE = datetime.timedelta(days=30)
+# Landmark of the forward-decay scale; weights double every half-life after
+# it, which a float holds for the next ~80 years
+POPULARITY_EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def popularity_weight(when):
+    """
+    Forward-decay weight of a sale made at ``when``.
+
+    Instead of decaying every stored score as time passes, newer sales count
+    exponentially more. ``popularity`` is then the plain sum of
+    ``units * weight`` and orders products exactly like units sold with a
+    30-day half-life, without any periodic rewrite.
+    """
+    return 2.0 ** ((when - POPULARITY_EPOCH) / POPULARITY_HALF_LIFE)
+
+
+def record_sales(lines, when, sign=1):
+    """
+    Add (or with ``sign=-1`` take back) ``(product_id, quantity)`` sales made
+    at ``when`` to ``Product.popularity`` in one UPDATE, then retire the
+    cached lists, whose popularity ordering just changed.
+    """
+    weight = popularity_weight(when) * sign
+    deltas = {}
+    for product_id, quantity in lines:
+        deltas[product_id] = deltas.get(product_id, 0.0) + quantity * weight
+    if not deltas:
+        return
+    Product.objects.filter(pk__in=deltas).update(
+        popularity=F("popularity") + Case(
+            *(When(pk=product_id, then=Value(delta)) for product_id, delta in deltas.items()),
+            output_field=FloatField(),
+        )
+    )
+    # Once committed, or a reader could cache the old order again
+    transaction.on_commit(lambda: invalidate_cache("products_list", "products_facets"))
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from core.utils.cache_utils import invalidate_cache
+from orders.models import OrderItem
+from .models import ProductRecommendation, RecommendationRun
+
+RECOMMENDATIONS_PER_PRODUCT = 10
+# Co-occurrence rows computed per sparse matrix product, bounds peak memory
+PRODUCT_CHUNK_SIZE = 2000
+WRITE_BATCH_SIZE = 5000
+# Orders paid in still-open transactions can carry an earlier paid_at than
+# the run's snapshot; stopping the watermark this far back picks them up next run
+WATERMARK_LAG = timedelta(minutes=1)
+
+
+def _paid_items():
+    return OrderItem.objects.filter(order__paid_at__isnull=False).exclude(order__status="cancelled")
+
+
+def _basket_matrix(items):
+    """
+    Binary orders x products CSR matrix of ``items`` and the product id of
+    each column. Rows are streamed straight into a NumPy buffer.
+    """
+    pairs = items.values_list("order_id", "product_id").order_by()
+    flat = np.fromiter(chain.from_iterable(pairs.iterator(chunk_size=10000)), dtype=np.int64)
+    orders, products = flat[0::2], flat[1::2]
+    order_ids, rows = np.unique(orders, return_inverse=True)
+    product_ids, columns = np.unique(products, return_inverse=True)
+    baskets = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, columns)),
+        shape=(len(order_ids), len(product_ids)),
+    )
+    # A product listed twice in one order still counts once
+    baskets.data[:] = 1
+    return baskets, product_ids
+
+
+def _top_neighbours(baskets, product_ids, targets, top_k):
+    """
+    Yield ``(product_id, [(related_id, score), ...])`` for each column index in
+    ``targets``: the products sharing the most orders with it, best first.
+    """
+    by_product = baskets.T.tocsr()
+    for start in range(0, len(targets), PRODUCT_CHUNK_SIZE):
+        chunk = targets[start:start + PRODUCT_CHUNK_SIZE]
+        # Row i: number of orders containing both chunk[i] and each product
+        counts = (by_product[chunk] @ baskets).tocsr()
+        for row, column in enumerate(chunk):
+            begin, end = counts.indptr[row], counts.indptr[row + 1]
+            neighbours, scores = counts.indices[begin:end], counts.data[begin:end]
+            keep = neighbours != column
+            neighbours, scores = neighbours[keep], scores[keep]
+            if len(scores) > top_k:
+                # Keep every tie at the cut so the id tie-break below picks
+                # the same neighbours whichever basket subset was scored
+                cut = -np.partition(-scores, top_k - 1)[top_k - 1]
+                best = scores >= cut
+                neighbours, scores = neighbours[best], scores[best]
+            # Highest score first, lower product id breaks ties
+            order = np.lexsort((product_ids[neighbours], -scores))[:top_k]
+            yield int(product_ids[column]), [
+                (int(product_ids[neighbours[index]]), int(scores[index])) for index in order
+            ]
+
+
+def update_recommendations(full=False, top_k=RECOMMENDATIONS_PER_PRODUCT):
+    """
+    Refresh the "frequently bought together" table from paid orders.
+
+    The first run (or ``full=True``) scores every product. Later runs only
+    read orders paid since the previous run's watermark: a pair's count can
+    only change if a new order contains both products, so just the products
+    in those orders are rescored, over every paid basket containing them.
+    """
+    paid_until = timezone.now() - WATERMARK_LAG
+    last_run = RecommendationRun.objects.order_by("-paid_until").first()
+    full = full or last_run is None
+    items = _paid_items().filter(order__paid_at__lte=paid_until)
+
+    if full:
+        new_orders = items.values("order_id").distinct().count()
+        affected = None
+    else:
+        new_items = items.filter(order__paid_at__gt=last_run.paid_until)
+        new_orders = new_items.values("order_id").distinct().count()
+        affected = set(new_items.values_list("product_id", flat=True).distinct())
+        items = items.filter(order__in=_paid_items().filter(product_id__in=affected).values("order_id"))
+
+    scored = 0
+    with transaction.atomic():
+        stale = ProductRecommendation.objects.all()
+        if affected is not None:
+            stale = stale.filter(product_id__in=affected)
+        stale.delete()
+
+        if affected is None or affected:
+            baskets, product_ids = _basket_matrix(items)
+            if affected is None:
+                targets = np.arange(len(product_ids))
+            else:
+                targets = np.flatnonzero(np.isin(product_ids, list(affected)))
+            batch = []
+            for product_id, neighbours in _top_neighbours(baskets, product_ids, targets, top_k):
+                scored += 1
+                batch += [
+                    ProductRecommendation(
+                        product_id=product_id, related_id=related_id, rank=rank, score=score
+                    )
+                    for rank, (related_id, score) in enumerate(neighbours)
+                ]
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    ProductRecommendation.objects.bulk_create(batch)
+                    batch = []
+            ProductRecommendation.objects.bulk_create(batch)
+
+        run = RecommendationRun.objects.create(
+            paid_until=paid_until, full_rebuild=full, orders=new_orders, products=scored
+        )
+    if scored or full:
+        invalidate_cache("products_related")
+    return run
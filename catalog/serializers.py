@@ -1,15 +1,24 @@
 from rest_framework import serializers
 
+from core.utils.representation import CompiledRepresentationMixin
+from core.utils.sparse_fields import SparseFieldsMixin
 from .models import Category, Product
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, CompiledRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "slug", "parent"]
 
+    def validate_parent(self, value):
+        if value and self.instance and value.path.startswith(self.instance.path):
+            raise serializers.ValidationError(
+                "A category cannot be moved under its own subtree."
+            )
+        return value
 
-class ProductSerializer(serializers.ModelSerializer):
+
+class ProductSerializer(SparseFieldsMixin, CompiledRepresentationMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(), source="category", write_only=True
@@ -29,3 +38,18 @@ class ProductSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        expandable_fields = ("category",)
+
+
+class ProductBulkUpdateSerializer(serializers.Serializer):
+    """One row of a bulk price/stock update; at least one of the two is required."""
+
+    id = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    # The stock column is a 32-bit integer
+    stock = serializers.IntegerField(min_value=0, max_value=2147483647, required=False)
+
+    def validate(self, attrs):
+        if "price" not in attrs and "stock" not in attrs:
+            raise serializers.ValidationError("Provide price and/or stock.")
+        return attrs
@@ -0,0 +1,10 @@
+from celery import shared_task
+
+from .recommendations import update_recommendations
+
+
+@shared_task(ignore_result=True)
+def update_product_recommendations(full=False):
+    """Fold orders paid since the last run into the recommendations table (scheduled by beat)."""
+    run = update_recommendations(full=full)
+    return f"{run.orders} orders, {run.products} products rescored"
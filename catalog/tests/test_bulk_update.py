@@ -0,0 +1,68 @@
+import pytest
+from django.db.models import QuerySet
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalog.models import Product
+from core.utils.cache_utils import get_cache_generations
+
+NAMESPACES = ["products_list", "product_detail", "products_facets", "products_related"]
+
+
+@pytest.fixture
+def admin_client(make_user):
+    client = APIClient()
+    client.force_authenticate(make_user(is_staff=True))
+    return client
+
+
+def stock_and_prices():
+    return list(Product.objects.order_by("pk").values_list("stock", "price"))
+
+
+@pytest.mark.django_db
+def test_each_row_is_reported_and_valid_rows_are_written(admin_client, make_product):
+    first, second = make_product(stock=1), make_product(stock=2)
+    before = first.updated_at
+
+    response = admin_client.patch(reverse("product_bulk_update"), [
+        {"id": first.pk, "price": "4.50"},
+        {"id": second.pk, "stock": 7},
+        {"id": first.pk, "stock": 9},
+        {"id": 0, "stock": 1},
+        {"id": second.pk, "price": "-1"},
+        {"id": second.pk, "stock": 2147483648},
+        {"id": second.pk},
+    ], format="json")
+
+    assert response.status_code == 200
+    assert response.data["updated"] == 2
+    assert [result["status"] for result in response.data["results"]] == [
+        "updated", "updated", "invalid", "not_found", "invalid", "invalid", "invalid",
+    ]
+    first.refresh_from_db()
+    assert (first.stock, str(first.price)) == (1, "4.50")
+    assert first.updated_at > before
+    second.refresh_from_db()
+    assert (second.stock, str(second.price)) == (7, "1.00")
+
+
+@pytest.mark.django_db
+def test_a_failed_write_rolls_back_every_row(admin_client, make_product, monkeypatch):
+    products = [make_product(stock=index) for index in range(3)]
+    expected = stock_and_prices()
+    generations = get_cache_generations(*NAMESPACES)
+    bulk_update = QuerySet.bulk_update
+
+    def write_then_fail(self, objs, fields, batch_size=None):
+        bulk_update(self, objs, fields, batch_size=batch_size)
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(QuerySet, "bulk_update", write_then_fail)
+    with pytest.raises(RuntimeError):
+        admin_client.patch(
+            reverse("product_bulk_update"), [{"id": product.pk, "stock": 99} for product in products], format="json"
+        )
+
+    assert stock_and_prices() == expected
+    assert get_cache_generations(*NAMESPACES) == generations
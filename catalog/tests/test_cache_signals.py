@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+import pytest
+
+from catalog.models import Category
+from core.utils.cache_utils import get_cache_generations
+
+ORDER_NAMESPACES = ["orders_list", "order_detail"]
+
+
+@pytest.mark.django_db
+def test_product_write_retires_order_caches_on_commit(make_product, django_capture_on_commit_callbacks):
+    product = make_product()
+    before = get_cache_generations("products_list", *ORDER_NAMESPACES)
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        product.price = Decimal("2.00")
+        product.save()
+        # Nothing is bumped while the write is uncommitted
+        assert get_cache_generations("products_list", *ORDER_NAMESPACES) == before
+
+    for callback in callbacks:
+        callback()
+    after = get_cache_generations("products_list", *ORDER_NAMESPACES)
+    assert all(new != old for new, old in zip(after, before))
+
+
+@pytest.mark.django_db
+def test_category_write_retires_order_caches(django_capture_on_commit_callbacks):
+    category = Category.objects.create(name="Signals")
+    before = get_cache_generations(*ORDER_NAMESPACES)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        category.name = "Renamed"
+        category.save()
+
+    assert all(new != old for new, old in zip(get_cache_generations(*ORDER_NAMESPACES), before))
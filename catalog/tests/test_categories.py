@@ -0,0 +1,57 @@
+import pytest
+
+from catalog.models import Category
+
+
+def paths():
+    return dict(Category.objects.values_list("name", "path"))
+
+
+@pytest.mark.django_db
+def test_moving_a_category_reroots_its_whole_subtree():
+    root = Category.objects.create(name="Root")
+    other = Category.objects.create(name="Other")
+    child = Category.objects.create(name="Child", parent=root)
+    grandchild = Category.objects.create(name="Grandchild", parent=child)
+    leaf = Category.objects.create(name="Leaf", parent=grandchild)
+    assert paths()["Leaf"] == f"{root.pk}/{child.pk}/{grandchild.pk}/{leaf.pk}/"
+
+    child.parent = other
+    child.save()
+
+    assert paths() == {
+        "Root": f"{root.pk}/",
+        "Other": f"{other.pk}/",
+        "Child": f"{other.pk}/{child.pk}/",
+        "Grandchild": f"{other.pk}/{child.pk}/{grandchild.pk}/",
+        "Leaf": f"{other.pk}/{child.pk}/{grandchild.pk}/{leaf.pk}/",
+    }
+    assert set(other.get_descendants(include_self=False)) == {child, grandchild, leaf}
+    assert set(root.get_descendants()) == {root}
+
+
+@pytest.mark.django_db
+def test_moving_to_the_top_level_and_back():
+    root = Category.objects.create(name="Root")
+    child = Category.objects.create(name="Child", parent=root)
+    grandchild = Category.objects.create(name="Grandchild", parent=child)
+
+    child.parent = None
+    child.save()
+    assert paths()["Grandchild"] == f"{child.pk}/{grandchild.pk}/"
+
+    child.parent = root
+    child.save()
+    assert paths()["Grandchild"] == f"{root.pk}/{child.pk}/{grandchild.pk}/"
+
+
+@pytest.mark.django_db
+def test_a_category_cannot_move_under_its_own_subtree():
+    root = Category.objects.create(name="Root")
+    child = Category.objects.create(name="Child", parent=root)
+
+    root.parent = child
+    with pytest.raises(ValueError):
+        root.save()
+
+    assert paths() == {"Root": f"{root.pk}/", "Child": f"{root.pk}/{child.pk}/"}
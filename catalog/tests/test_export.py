@@ -0,0 +1,38 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from catalog.models import Product
+
+
+@pytest.fixture
+def admin_client(make_user):
+    client = APIClient()
+    client.force_authenticate(make_user(is_staff=True))
+    return client
+
+
+@pytest.mark.django_db
+def test_out_of_range_since_is_a_bad_request(admin_client):
+    response = admin_client.get(reverse("product_export"), {"since": "2024-13-45T00:00"})
+
+    assert response.status_code == 400
+    assert "since" in response.data
+
+
+@pytest.mark.django_db
+def test_incremental_export_ends_with_the_latest_change(admin_client, make_product):
+    first, second = make_product(), make_product()
+    # The older product changed last
+    Product.objects.filter(pk=first.pk).update(updated_at=timezone.now() + datetime.timedelta(minutes=1))
+    since = timezone.now() - datetime.timedelta(hours=1)
+
+    response = admin_client.get(
+        reverse("product_export"), {"since": since.isoformat(), "fields": "id,updated_at", "file_format": "csv"}
+    )
+
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert [line.split(",")[0] for line in lines[1:]] == [str(second.pk), str(first.pk)]
@@ -0,0 +1,37 @@
+import pytest
+
+from catalog.importers import import_products
+from catalog.models import Category, Product
+from core.utils.cache_utils import get_cache_generations
+
+
+@pytest.mark.django_db
+def test_out_of_range_values_are_reported_per_row():
+    Category.objects.create(name="Books")
+    rows = [
+        {"name": "x" * 256, "price": "1.00", "category": "Books"},
+        {"name": "Long slug", "slug": "s" * 256, "price": "1.00", "category": "Books"},
+        {"name": "Too dear", "price": "100000000.00", "category": "Books"},
+        {"name": "Too precise", "price": "1.005", "category": "Books"},
+        {"name": "Too many", "price": "1.00", "stock": 2147483648, "category": "Books"},
+        {"name": "Fine", "price": "1.00", "stock": 2147483647, "category": "Books"},
+        {"name": "y" * 255, "price": "1.00", "category": "Books"},
+    ]
+
+    stats = import_products(rows)
+
+    assert stats["created"] == 2
+    assert [error["row"] for error in stats["errors"]] == [1, 2, 3, 4, 5]
+    assert Product.objects.get(name="Fine").stock == 2147483647
+    assert len(Product.objects.get(name="y" * 255).slug) <= 255
+
+
+@pytest.mark.django_db
+def test_import_retires_views_embedding_products():
+    Category.objects.create(name="Books")
+    namespaces = ["products_list", "product_detail", "products_facets", "products_related"]
+    before = get_cache_generations(*namespaces)
+
+    import_products([{"name": "Atlas", "price": "1.00", "category": "Books"}])
+
+    assert all(new != old for new, old in zip(get_cache_generations(*namespaces), before))
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from catalog.models import ProductRecommendation, RecommendationRun
+from catalog.recommendations import update_recommendations
+from orders.models import Order, OrderItem
+
+TOP_K = 2
+
+
+@pytest.fixture
+def pay(make_user):
+    user = make_user()
+
+    def pay(products, paid_at, status="paid"):
+        order = Order.objects.create(
+            user=user, shipping_address="1 Street", payment_method="card", total_price=1,
+            status=status, paid_at=paid_at,
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=1, price=product.price) for product in products
+        )
+
+    return pay
+
+
+def recommendations():
+    return sorted(ProductRecommendation.objects.values_list("product_id", "rank", "related_id", "score"))
+
+
+@pytest.mark.django_db
+def test_incremental_run_matches_a_full_rebuild(make_product, pay):
+    a, b, c, d, e, f = (make_product() for _ in range(6))
+    earlier = timezone.now() - timedelta(hours=2)
+    for basket in ([a, b], [a, c], [a, d], [b, c, e], [e, f], [c, d, f]):
+        pay(basket, earlier)
+    pay([a, f], earlier, status="cancelled")
+    update_recommendations(top_k=TOP_K)
+    # Pretend the first run was an hour ago, so the orders below are new to the next one
+    RecommendationRun.objects.update(paid_until=timezone.now() - timedelta(hours=1))
+
+    later = timezone.now() - timedelta(minutes=30)
+    # Ties at the top-k cut against older baskets, and a product seen for the first time
+    for basket in ([f, a], [d, b], [d, a, make_product()]):
+        pay(basket, later)
+    run = update_recommendations(top_k=TOP_K)
+    incremental = recommendations()
+    update_recommendations(full=True, top_k=TOP_K)
+
+    assert not run.full_rebuild
+    assert run.orders == 3
+    assert incremental == recommendations()
+    # a shares two orders with d, then one each with b, c, f and the new product: the lowest id wins the tie
+    assert list(a.recommendations.order_by("rank").values_list("related_id", "score")) == [(d.pk, 2), (b.pk, 1)]
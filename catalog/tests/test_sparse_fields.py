@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalog.models import Product
+
+
+@pytest.fixture
+def product(make_product):
+    cache.clear()
+    return make_product(name="Novel", price="9.99", stock=5)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query", ["fields=", "fields=,,", "expand="])
+def test_empty_sparse_parameter_is_the_default_response(product, query):
+    client = APIClient()
+    url = reverse("product_list_create")
+
+    # The empty parameter is cached first, under the plain list's key
+    sparse = client.get(f"{url}?{query}")
+    plain = client.get(url)
+
+    assert sparse.status_code == plain.status_code == 200
+    assert json.loads(sparse.content) == json.loads(plain.content)
+    assert json.loads(plain.content)["results"][0]["name"] == "Novel"
+
+
+@pytest.mark.django_db
+def test_sparse_parameters_do_not_restrict_writes(product, make_user):
+    client = APIClient()
+    client.force_authenticate(make_user(is_staff=True))
+
+    response = client.post(
+        f"{reverse('product_list_create')}?fields=id",
+        {"name": "Atlas", "price": "19.99", "stock": 3, "category_id": product.category_id},
+        format="json",
+    )
+
+    assert response.status_code == 201, response.data
+    assert response.data["name"] == "Atlas"
+    assert Product.objects.get(pk=response.data["id"]).stock == 3
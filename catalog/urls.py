@@ -1,12 +1,19 @@
 from django.urls import path
 from .views import (
-    CategoryListCreateView, CategoryDetailView,
-    ProductListCreateView, ProductDetailView
+    CategoryListCreateView, CategoryDetailView, CategoryTreeView,
+    ProductListCreateView, ProductDetailView, ProductBulkUpdateView, ProductExportView,
+    ProductImportView, ProductRelatedView, ProductSuggestView,
 )
 
 urlpatterns = [
     path("categories/", CategoryListCreateView.as_view(), name="category_list_create"),
+    path("categories/tree/", CategoryTreeView.as_view(), name="category_tree"),
     path("categories/<int:pk>/", CategoryDetailView.as_view(), name="category_detail"),
     path("products/", ProductListCreateView.as_view(), name="product_list_create"),
+    path("products/bulk/", ProductBulkUpdateView.as_view(), name="product_bulk_update"),
+    path("products/export/", ProductExportView.as_view(), name="product_export"),
+    path("products/import/", ProductImportView.as_view(), name="product_import"),
+    path("products/suggest/", ProductSuggestView.as_view(), name="product_suggest"),
     path("products/<int:pk>/", ProductDetailView.as_view(), name="product_detail"),
+    path("products/<int:pk>/related/", ProductRelatedView.as_view(), name="product_related"),
 ]
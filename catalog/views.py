@@ -1,15 +1,41 @@
+import csv
+import io
+from pathlib import Path
+
+from django.contrib.postgres.search import TrigramDistance
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import generics, permissions, filters
+from rest_framework import generics, permissions, filters, serializers
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.utils.cache_utils import cache_response, invalidate_cache
-from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
+from core.utils.cache_utils import cache_response, invalidate_cache, versioned_cache_key
+from core.utils.export import export_response
+from core.utils.pagination import PageNumberOrCursorPagination
+from core.utils.sparse_fields import SparseQuerysetMixin
+from .facets import FACETS
+from .filters import ProductFilter, ProductSearchFilter
+from .importers import IMPORT_FORMATS, import_products, read_rows
+from .models import PRODUCT_NAME_KEY, Category, Product, ProductRecommendation
+from .serializers import CategorySerializer, ProductBulkUpdateSerializer, ProductSerializer
 
-CACHE_TTL = 60 * 10  # 10 minutes
+CACHE_TTL = 60 * 60  # 1 hour, entries are retired by generation bumps
+# Catalog reads may be served up to a minute stale while one request recomputes them
+STALE_TTL = 60
+# Tiny, very hot responses are also kept in each worker's memory
+LOCAL_TTL = 60
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_LIMIT = 20
+BULK_UPDATE_MAX_ROWS = 5000
 
 
 # Category Views
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
@@ -18,6 +44,46 @@ class CategoryListCreateView(generics.ListCreateAPIView):
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
 
+    @cache_response(
+        timeout=CACHE_TTL,
+        key_prefix="categories_list",
+        per_user=False,
+        stale_ttl=STALE_TTL,
+        local_ttl=LOCAL_TTL,
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class CategoryTreeView(APIView):
+    """
+    The whole category hierarchy as nested ``children`` lists, in one query.
+
+    Nodes are linked in a second pass over the rows, so assembly is O(n) and
+    siblings keep the query's name order.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @cache_response(
+        timeout=CACHE_TTL,
+        key_prefix="categories_tree",
+        per_user=False,
+        stale_ttl=STALE_TTL,
+        local_ttl=LOCAL_TTL,
+    )
+    def get(self, request, *args, **kwargs):
+        rows = list(Category.objects.order_by("name").values("id", "name", "slug", "parent_id"))
+        nodes = {
+            row["id"]: {"id": row["id"], "name": row["name"], "slug": row["slug"], "children": []}
+            for row in rows
+        }
+        roots = []
+        for row in rows:
+            parent = nodes.get(row["parent_id"])
+            (parent["children"] if parent else roots).append(nodes[row["id"]])
+        return Response(roots)
+
 
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
@@ -30,17 +96,19 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Product Views
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(SparseQuerysetMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all().order_by("-created_at")
     serializer_class = ProductSerializer
+    pagination_class = PageNumberOrCursorPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
         filters.OrderingFilter,
+        ProductSearchFilter,  # ?q= full-text search, ranks after ordering
     ]
-    filterset_fields = ["category__id", "price"]
+    filterset_class = ProductFilter
     search_fields = ["name", "description"]
-    ordering_fields = ["price", "created_at", "name"]
+    ordering_fields = ["price", "created_at", "name", "popularity"]
     ordering = ["name"]
 
     def get_permissions(self):
@@ -48,16 +116,188 @@ class ProductListCreateView(generics.ListCreateAPIView):
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
 
-    @cache_response(timeout=300, key_prefix="products_list")
+    # Query params that page, sort or shape results without changing the matched set
+    facet_independent_params = (
+        "page", "cursor", "paginate", "ordering", "facets", "fields", "expand",
+    )
+
+    @cache_response(
+        timeout=CACHE_TTL, key_prefix="products_list", per_user=False, stale_ttl=STALE_TTL
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         return Product.objects.select_related("category").all().order_by("-created_at")
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        names = [name for name in request.query_params.get("facets", "").split(",") if name]
+        if names and isinstance(response.data, dict):
+            response.data["facets"] = self.get_facets(names)
+        return response
+
+    def get_facets(self, names):
+        """
+        Counts for each requested facet over the current filter/search set.
+
+        Each dimension is one aggregate query, cached per normalized filter
+        set so paging or re-sorting the same results reuses it.
+        """
+        unknown = sorted(set(names) - set(FACETS))
+        if unknown:
+            raise serializers.ValidationError({"facets": f"Unknown facets: {', '.join(unknown)}."})
+
+        cache_key = versioned_cache_key(
+            "products_facets",
+            self.request,
+            per_user=False,
+            exclude_params=self.facet_independent_params,
+        )
+        facets = cache.get_many([f"{cache_key}:{name}" for name in names])
+        queryset = self.filter_queryset(self.get_queryset())
+        result = {}
+        for name in names:
+            key = f"{cache_key}:{name}"
+            if key not in facets:
+                facets[key] = FACETS[name](queryset)
+                cache.set(key, facets[key], CACHE_TTL)
+            result[name] = facets[key]
+        return result
+
     def perform_create(self, serializer):
         serializer.save()
         invalidate_cache("products_list")  # clear the cached list
 
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductImportView(APIView):
+    """
+    Bulk upsert products from an uploaded CSV or NDJSON ``file``.
+
+    The format comes from the file extension unless ``file_format`` is sent.
+    Rows are streamed from the upload and written in batches; see
+    ``catalog.importers.import_products`` for the accepted columns.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise serializers.ValidationError({"file": "This field is required."})
+        file_format = request.data.get("file_format") or IMPORT_FORMATS.get(
+            Path(upload.name).suffix.lower()
+        )
+        if file_format not in IMPORT_FORMATS.values():
+            raise serializers.ValidationError({"file_format": "Expected csv or ndjson."})
+
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        try:
+            stats = import_products(read_rows(stream, file_format))
+        except (UnicodeDecodeError, ValueError, csv.Error) as exc:
+            raise serializers.ValidationError({"file": str(exc)})
+        return Response(stats)
+
+
+class ProductBulkUpdateView(APIView):
+    """
+    Apply a list of ``{id, price, stock}`` changes in one request (admin only).
+
+    Valid rows are written with a single ``bulk_update`` and product caches
+    are retired with one generation bump per batch instead of one per row.
+    The response reports the outcome of every row, in request order.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def patch(self, request, *args, **kwargs):
+        if not isinstance(request.data, list) or not request.data:
+            raise serializers.ValidationError("Expected a non-empty list of changes.")
+        if len(request.data) > BULK_UPDATE_MAX_ROWS:
+            raise serializers.ValidationError(
+                f"At most {BULK_UPDATE_MAX_ROWS} changes per request."
+            )
+
+        results, changes = [], {}
+        for row in request.data:
+            serializer = ProductBulkUpdateSerializer(data=row)
+            if not serializer.is_valid():
+                results.append({
+                    "id": row.get("id") if isinstance(row, dict) else None,
+                    "status": "invalid",
+                    "errors": serializer.errors,
+                })
+                continue
+            change = serializer.validated_data
+            if change["id"] in changes:
+                results.append({
+                    "id": change["id"],
+                    "status": "invalid",
+                    "errors": {"id": ["Duplicate id in batch."]},
+                })
+                continue
+            changes[change["id"]] = change
+            results.append({"id": change["id"], "status": None})
+
+        now = timezone.now()
+        with transaction.atomic():
+            # Lock in id order so concurrent batches cannot deadlock
+            locked = (
+                Product.objects.select_for_update()
+                .only("id", "price", "stock")
+                .filter(pk__in=changes)
+                .order_by("pk")
+            )
+            products = {product.pk: product for product in locked}
+            for product in products.values():
+                change = changes[product.pk]
+                product.price = change.get("price", product.price)
+                product.stock = change.get("stock", product.stock)
+                # bulk_update skips auto_now, so keep Last-Modified and ?since= exports honest
+                product.updated_at = now
+            Product.objects.bulk_update(
+                products.values(), ["price", "stock", "updated_at"], batch_size=1000
+            )
+
+        for result in results:
+            if result["status"] is None:
+                result["status"] = "updated" if result["id"] in products else "not_found"
+        if products:
+            invalidate_cache(
+                "products_list", "product_detail", "products_facets", "products_related", "orders_list", "order_detail"
+            )
+        return Response({"updated": len(products), "results": results})
+
+
+class ProductExportView(APIView):
+    """
+    Stream the whole catalog as CSV or NDJSON (admin only).
+
+    ``?file_format=csv|ndjson``, ``?fields=`` picks columns and ``?since=``
+    limits the export to products updated after that timestamp.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    # Export column -> ORM lookup
+    columns = {
+        "id": "id",
+        "name": "name",
+        "slug": "slug",
+        "description": "description",
+        "price": "price",
+        "stock": "stock",
+        "category": "category__slug",
+        "category_name": "category__name",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
+
+    def get(self, request, *args, **kwargs):
+        return export_response(Product.objects.all(), self.columns, request.query_params, "products")
+
+
+class ProductDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
@@ -66,7 +306,17 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
 
-    @cache_response(timeout=300, key_prefix="product_detail")
+    @cache_response(
+        timeout=300,
+        key_prefix="product_detail",
+        per_user=False,
+        last_modified_field="updated_at",
+        stale_ttl=STALE_TTL,
+        local_ttl=LOCAL_TTL,
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         return Product.objects.select_related("category").all()
 
@@ -77,3 +327,77 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     def perform_destroy(self, instance):
         invalidate_cache(f"product_detail_{instance.pk}", "products_list")
         instance.delete()
+
+
+class ProductRelatedView(APIView):
+    """
+    "Frequently bought together" for a product, best first, as precomputed
+    by ``manage.py build_recommendations`` / the scheduled Celery task.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @cache_response(
+        timeout=CACHE_TTL, key_prefix="products_related", per_user=False, stale_ttl=STALE_TTL
+    )
+    def get(self, request, pk, *args, **kwargs):
+        rows = (
+            ProductRecommendation.objects.filter(product_id=pk)
+            .order_by("rank")
+            .values("related_id", "related__name", "related__slug", "related__price", "score")
+        )
+        return Response([
+            {
+                "id": row["related_id"],
+                "name": row["related__name"],
+                "slug": row["related__slug"],
+                "price": str(row["related__price"]),
+                "score": row["score"],
+            }
+            for row in rows
+        ])
+
+
+class ProductSuggestView(APIView):
+    """
+    Type-ahead suggestions: id, name and slug of the top matches for ``?q=``.
+
+    Prefix matches come first, straight off the ``product_name_prefix_idx``
+    btree in name order. If they do not fill ``?limit=`` (default 10, max 20),
+    infix matches and names within pg_trgm's similarity threshold (typos,
+    transpositions) are added nearest-first from the trigram index.
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    @cache_response(
+        timeout=CACHE_TTL, key_prefix="products_suggest", per_user=False, stale_ttl=STALE_TTL
+    )
+    def get(self, request, *args, **kwargs):
+        term = request.query_params.get("q", "").strip()
+        try:
+            limit = min(int(request.query_params.get("limit", SUGGEST_LIMIT)), SUGGEST_MAX_LIMIT)
+        except ValueError:
+            limit = SUGGEST_LIMIT
+        if not term or limit < 1:
+            return Response([])
+
+        suggestions = list(
+            Product.objects.annotate(name_key=PRODUCT_NAME_KEY)
+            .filter(name_key__startswith=term.upper())
+            .order_by("name_key")
+            .values("id", "name", "slug")[:limit]
+        )
+        # Trigrams need at least three characters to narrow anything down
+        if len(suggestions) < limit and len(term) >= 3:
+            # Both filters and the ordering are on UPPER(name), the expression
+            # product_name_trgm_idx covers
+            suggestions += list(
+                Product.objects.annotate(name_upper=Upper("name"))
+                .filter(Q(name_upper__contains=term.upper()) | Q(name_upper__trigram_similar=term.upper()))
+                .exclude(id__in=[suggestion["id"] for suggestion in suggestions])
+                .annotate(distance=TrigramDistance(Upper("name"), term.upper()))
+                .order_by("distance")
+                .values("id", "name", "slug")[: limit - len(suggestions)]
+            )
+        return Response(suggestions)
@@ -0,0 +1,39 @@
+import itertools
+from decimal import Decimal
+
+import pytest
+
+from catalog.models import Category, Product
+from users.models import User
+
+
+@pytest.fixture
+def make_user(db):
+    """Factory for users with distinct emails: ``make_user(is_staff=True)``."""
+    numbers = itertools.count()
+
+    def make(email=None, password="secret", **fields):
+        return User.objects.create_user(email=email or f"user{next(numbers)}@example.com", password=password, **fields)
+
+    return make
+
+
+@pytest.fixture
+def make_product(db):
+    """Factory for products with distinct names and slugs in a shared category unless one is given."""
+    numbers = itertools.count()
+
+    def make(stock=10, price="1.00", name=None, category=None, **fields):
+        number = next(numbers)
+        if category is None:
+            category, _ = Category.objects.get_or_create(name="Products")
+        return Product.objects.create(
+            name=name or f"Product {number}",
+            slug=f"product-{number}",
+            price=Decimal(price),
+            stock=stock,
+            category=category,
+            **fields,
+        )
+
+    return make
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "drf_yasg",
@@ -145,6 +146,19 @@ CACHES = {
     }
 }
 
+# Per-process tier in front of Redis for views opting in with cache_response(local_ttl=...)
+LOCAL_CACHE_MAX_ENTRIES = config("LOCAL_CACHE_MAX_ENTRIES", default=1000, cast=int)
+
+# Where live carts are kept: "cart.backends.RedisCartBackend" keeps them in
+# Redis and writes them behind to the cart tables
+CART_BACKEND = config("CART_BACKEND", default="cart.backends.DatabaseCartBackend")
+CART_REDIS_TTL = config("CART_REDIS_TTL", default=7 * 24 * 60 * 60, cast=int)  # seconds
+# Hold stock for items added to carts (database cart backend only)
+CART_RESERVATIONS = config("CART_RESERVATIONS", default=False, cast=bool)
+CART_RESERVATION_TTL = config("CART_RESERVATION_TTL", default=15 * 60, cast=int)  # seconds
+# Carts untouched this long are deleted by the cleanup job; keep it above CART_REDIS_TTL
+CART_ABANDONED_AFTER_DAYS = config("CART_ABANDONED_AFTER_DAYS", default=30, cast=int)
+
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
         "Bearer": {
@@ -176,6 +190,24 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+CELERY_BEAT_SCHEDULE = {
+    "update-product-recommendations": {
+        "task": "catalog.tasks.update_product_recommendations",
+        "schedule": 15 * 60,  # seconds
+    },
+    "flush-carts": {
+        "task": "cart.tasks.flush_carts",
+        "schedule": 60,  # seconds
+    },
+    "expire-stock-reservations": {
+        "task": "cart.tasks.expire_stock_reservations",
+        "schedule": 60,  # seconds
+    },
+    "delete-abandoned-carts": {
+        "task": "cart.tasks.delete_abandoned_carts",
+        "schedule": 60 * 60,  # seconds
+    },
+}
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -22,6 +22,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from .views import CacheStatsView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Ecommerce API",
@@ -53,4 +55,5 @@ urlpatterns = [
     path("api/catalog/", include("catalog.urls")),
     path("api/cart/", include("cart.urls")),
     path("api/orders/", include("orders.urls")),
+    path("api/cache/stats/", CacheStatsView.as_view(), name="cache_stats"),
 ]
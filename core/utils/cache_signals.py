@@ -1,29 +1,49 @@
 # core/utils/cache_signals.py
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .cache_utils import invalidate_cache
 
 
-def register_cache_invalidation(model_class, list_cache_key_prefix=None, detail_cache_key_prefix=None):
+def register_cache_invalidation(
+    model_class, list_cache_key_prefix=None, detail_cache_key_prefix=None, related_cache_key_prefixes=()
+):
     """
     Automatically invalidate cache when a model instance is created/updated/deleted.
 
+    Invalidation bumps generation counters (see ``cache_utils``), so every
+    per-user and per-kwarg key derived from a prefix is retired at once. The
+    bump runs when the surrounding transaction commits.
+
     Args:
         model_class: Django model class to observe
         list_cache_key_prefix: Prefix used for cached list view
         detail_cache_key_prefix: Prefix used for cached detail view
+        related_cache_key_prefixes: Prefixes of other views that embed this model
+            (e.g. products nesting their category); invalidated as a whole
     """
 
-    @receiver([post_save, post_delete], sender=model_class)
+    @receiver([post_save, post_delete], sender=model_class, weak=False)
     def clear_cache(sender, instance, **kwargs):
+        namespaces = []
         # Invalidate detail cache
         if detail_cache_key_prefix:
-            invalidate_cache(f"{detail_cache_key_prefix}_{instance.pk}")
+            namespaces.append(f"{detail_cache_key_prefix}_{instance.pk}")
 
         # Invalidate list cache
         if list_cache_key_prefix:
-            # If user-specific cache
+            # If user-specific cache, staff lists include every user's rows too
             if hasattr(instance, 'user_id'):
-                invalidate_cache(f"{list_cache_key_prefix}_user_{instance.user_id}")
+                namespaces += [
+                    f"{list_cache_key_prefix}_user_{instance.user_id}",
+                    f"{list_cache_key_prefix}_staff",
+                ]
             else:
-                invalidate_cache(f"{list_cache_key_prefix}")
+                namespaces.append(f"{list_cache_key_prefix}")
+
+        # Invalidate views embedding this model
+        namespaces += related_cache_key_prefixes
+
+        # Only once the write is visible: bumped earlier, a concurrent read
+        # could cache the old rows under the new generation
+        transaction.on_commit(lambda: invalidate_cache(*namespaces))
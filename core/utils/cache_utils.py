@@ -1,38 +1,324 @@
+import calendar
+import hashlib
+import math
+import random
+import time
 from functools import wraps
+from urllib.parse import urlencode
 
 from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework.response import Response
 
+from .local_cache import local_cache, local_tier_ready, publish_invalidation, stats
 
-def cache_response(timeout=300, key_prefix=None):
+GENERATION_KEY_PREFIX = "cachegen"
+# Single-flight recompute lock: upper bound on one recompute, and how often waiters poll
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+# XFetch eagerness: 1 is the paper's default, higher refreshes earlier
+XFETCH_BETA = 1.0
+# How long a process trusts its copy of a generation counter should an
+# invalidation message be lost
+LOCAL_GENERATION_TTL = 5
+
+
+def _generation_key(namespace):
+    return f"{GENERATION_KEY_PREFIX}:{namespace}"
+
+
+def get_cache_generations(*namespaces):
+    """
+    Return the current generation counter for each namespace, in order.
+
+    Missing counters are seeded with a time-based value rather than 1, so a
+    counter that was evicted from Redis can never fall back to a generation
+    that older cache entries were written under.
+
+    Counters are also kept in the in-process tier while this process is
+    subscribed to invalidation messages, so hot reads skip Redis entirely.
     """
-    DRY decorator for caching view queryset responses.
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    use_local = local_tier_ready()
+    known = {}
+    if use_local:
+        for key in keys:
+            generation = local_cache.get(key)
+            if generation is not None:
+                known[key] = generation
+        stats["generation_local_hits"] += len(known)
+        stats["generation_local_misses"] += len(keys) - len(known)
+
+    missing = [key for key in keys if key not in known]
+    if missing:
+        epoch = local_cache.invalidations
+        found = cache.get_many(missing)
+        stats["generation_redis_hits"] += len(found)
+        stats["generation_redis_misses"] += len(missing) - len(found)
+        for key in missing:
+            generation = found.get(key)
+            if generation is None:
+                cache.add(key, time.time_ns() // 1000, timeout=None)
+                generation = cache.get(key)
+            known[key] = generation
+            if use_local:
+                local_cache.set(key, generation, LOCAL_GENERATION_TTL, epoch=epoch)
+    return [known[key] for key in keys]
+
+
+def bump_cache_generation(namespace):
+    """
+    Invalidate every cache entry derived from ``namespace`` in O(1).
+    """
+    key = _generation_key(namespace)
+    try:
+        generation = cache.incr(key)
+    except ValueError:
+        # Counter not seeded yet: nothing can have been cached under it
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(key)
+    publish_invalidation(key)
+    return generation
+
+
+def normalized_query_string(request, exclude=()):
+    """
+    Canonical form of the request's query string: empty values dropped,
+    parameters sorted, so ``?page=2&search=x`` and ``?search=x&page=2&q=``
+    share a cache entry.
+    """
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in exclude
+        for value in values
+        if value != ""
+    )
+    return urlencode(params)
+
+
+def cache_namespaces(prefix, request, view_kwargs=None, per_user=True):
+    """
+    Namespaces an entry under ``prefix`` depends on: the prefix itself, the
+    user scope (``<prefix>_user_<id>``, plus ``<prefix>_staff`` for staff who
+    see every user's rows) and each view kwarg (``<prefix>_<value>``, e.g.
+    ``product_detail_5``).
+    """
+    namespaces = [prefix]
+    user = getattr(request, "user", None)
+    if per_user and user and user.is_authenticated:
+        namespaces.append(f"{prefix}_user_{user.id}")
+        if user.is_staff:
+            namespaces.append(f"{prefix}_staff")
+    for value in (view_kwargs or {}).values():
+        namespaces.append(f"{prefix}_{value}")
+    return namespaces
+
+
+def versioned_cache_key(prefix, request, view_kwargs=None, per_user=True, exclude_params=()):
+    """
+    Build a cache key for ``request`` stamped with the current generation of
+    every namespace it depends on. Bumping any of them through
+    ``invalidate_cache`` retires the key.
+    """
+    namespaces = cache_namespaces(prefix, request, view_kwargs, per_user)
+    generations = get_cache_generations(*namespaces)
+    user = getattr(request, "user", None)
+    scope = f"user_{user.id}" if per_user and user and user.is_authenticated else "public"
+    renderer = getattr(request, "accepted_renderer", None)
+    variant = "|".join(
+        [
+            request.path,
+            normalized_query_string(request, exclude=exclude_params),
+            getattr(renderer, "format", ""),
+        ]
+    )
+    digest = hashlib.md5(variant.encode()).hexdigest()
+    version = ".".join(str(g) for g in generations)
+    return f"{prefix}:{scope}:g{version}:{digest}"
+
+
+def _timestamp(value):
+    """Parse a serialized datetime into a Unix timestamp for Last-Modified."""
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    return calendar.timegm(parsed.utctimetuple()) if parsed else None
+
+
+def _entry_key(cache_key):
+    """``prefix:scope:g<version>:digest`` -> ``prefix:scope:digest``, stable across versions."""
+    head, _, digest = cache_key.rpartition(":")
+    return f"{head.rpartition(':')[0]}:{digest}"
+
+
+def _refresh_early(entry, now, beta):
+    """
+    Probabilistic early expiration (XFetch): the closer an entry is to its
+    expiry and the longer it took to compute, the likelier one request
+    recomputes it ahead of time, so a hot key never expires for everyone
+    at once.
+    """
+    return now - entry["compute_time"] * beta * math.log(1.0 - random.random()) >= entry["expires"]
+
+
+def _wait_for_entry(entry_key, cache_key, lock_key, wait):
+    """
+    Poll until the lock holder stores ``cache_key``'s entry. Returns ``None``
+    once the lock is released without one (an error or a non-200 response
+    is never stored) or when ``wait`` runs out.
+    """
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        # Checked before the entry: a holder that is done has already stored it
+        released = cache.get(lock_key) is None
+        entry = cache.get(entry_key)
+        if entry is not None and entry["key"] == cache_key:
+            return entry
+        if released:
+            return None
+    return None
+
+
+def cache_response(
+    timeout=300,
+    key_prefix=None,
+    per_user=True,
+    last_modified_field=None,
+    stale_ttl=0,
+    lock_timeout=LOCK_TIMEOUT,
+    beta=XFETCH_BETA,
+    local_ttl=0,
+):
+    """
+    DRY decorator for caching rendered view responses.
+
+    Wraps a DRF handler method (``get``). On a miss the response is rendered
+    once and its bytes are stored; a hit returns those bytes directly, so
+    neither the ORM nor the serializers run. Keys are built from the path,
+    the normalized query string (filters, search, ordering, page) and the
+    auth scope, and are retired by generation bumps (see
+    ``versioned_cache_key``). Only successful JSON responses are cached.
+
+    Responses also carry a weak ``ETag`` derived from the versioned key, so
+    a matching ``If-None-Match`` gets a 304 before the cache entry is even
+    fetched. With ``last_modified_field`` the object's timestamp is stored
+    next to the bytes and sent as ``Last-Modified`` for ``If-Modified-Since``.
+
+    Entries are stored under a version-free key with the versioned key inside,
+    so an invalidated entry stays readable. Recomputes are single-flight: the
+    request that wins a short ``cache.add`` lock rebuilds the entry while the
+    others wait for it, or, with ``stale_ttl``, are served the previous entry
+    meanwhile (stale-while-revalidate). Entries are also refreshed early with
+    a probability that grows as they near expiry (XFetch).
 
     :param timeout: cache duration in seconds (default 5 min)
     :param key_prefix: optional prefix for the cache key
+    :param per_user: scope entries to the requesting user; disable for
+        responses that are identical for everyone (catalog reads)
+    :param last_modified_field: response field holding the object's
+        modification time (e.g. ``updated_at``) for detail views
+    :param stale_ttl: seconds an expired or invalidated entry is kept to be
+        served while another request recomputes it; 0 never serves stale
+    :param lock_timeout: upper bound in seconds on one recompute
+    :param beta: XFetch eagerness; 0 disables early refresh
+    :param local_ttl: also keep entries in this process's memory for this
+        many seconds; for small, very hot responses. A local entry is only
+        served while its versioned key is current, so it needs no
+        invalidation of its own
     """
 
     def decorator(func):
+        def compute(view_instance, request, args, kwargs, cache_key, etag):
+            started = time.monotonic()
+            response = func(view_instance, request, *args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response, None
+            last_modified = None
+            if last_modified_field and isinstance(response.data, dict):
+                last_modified = _timestamp(response.data.get(last_modified_field))
+            response = view_instance.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            entry = {
+                "key": cache_key,
+                "etag": etag,
+                "content": response.content,
+                "content_type": response["Content-Type"],
+                "last_modified": last_modified,
+                "expires": time.time() + timeout,
+                "compute_time": time.monotonic() - started,
+            }
+            # Kept past its logical expiry only if it may be served stale
+            cache.set(_entry_key(cache_key), entry, timeout + stale_ttl)
+            if local_ttl:
+                local_cache.set(_entry_key(cache_key), entry, local_ttl)
+            return response, entry
+
+        def lookup(entry_key, cache_key):
+            if local_ttl and local_tier_ready():
+                entry = local_cache.get(entry_key)
+                if entry is not None and entry["key"] == cache_key:
+                    stats["local_hits"] += 1
+                    return entry
+                stats["local_misses"] += 1
+            entry = cache.get(entry_key)
+            stats["redis_hits" if entry is not None else "redis_misses"] += 1
+            if local_ttl and entry is not None and entry["key"] == cache_key:
+                local_cache.set(entry_key, entry, local_ttl)
+            return entry
+
         @wraps(func)
-        def wrapper(view_instance, *args, **kwargs):
-            user = getattr(view_instance.request, "user", None)
-            # Build cache key: user-based for list views, pk-based for detail views
-            key_parts = [key_prefix or func.__name__]
-            if user and user.is_authenticated:
-                key_parts.append(f"user_{user.id}")
-            # Add kwargs if present (for detail views)
-            for k, v in kwargs.items():
-                key_parts.append(f"{k}_{v}")
-            cache_key = "_".join(key_parts)
-
-            # Try fetching from cache
-            cached_data = cache.get(cache_key)
-            if cached_data is not None:
-                return cached_data
-
-            # Compute result if not cached
-            result = func(view_instance, *args, **kwargs)
-            cache.set(cache_key, result, timeout)
-            return result
+        def wrapper(view_instance, request, *args, **kwargs):
+            renderer = getattr(request, "accepted_renderer", None)
+            if getattr(renderer, "format", None) != "json":
+                return func(view_instance, request, *args, **kwargs)
+
+            cache_key = versioned_cache_key(
+                key_prefix or func.__name__, request, kwargs, per_user=per_user
+            )
+            etag = f'W/"{hashlib.md5(cache_key.encode()).hexdigest()}"'
+
+            # The version stamp alone answers If-None-Match
+            if request.META.get("HTTP_IF_NONE_MATCH"):
+                not_modified = get_conditional_response(request, etag=etag)
+                if not_modified is not None:
+                    not_modified["ETag"] = etag
+                    return not_modified
+
+            entry_key = _entry_key(cache_key)
+            entry = lookup(entry_key, cache_key)
+            fresh = entry is not None and entry["key"] == cache_key and time.time() < entry["expires"]
+            if not fresh or _refresh_early(entry, time.time(), beta):
+                lock_key = f"lock:{entry_key}"
+                if cache.add(lock_key, 1, lock_timeout):
+                    # Single flight: only the lock holder recomputes
+                    try:
+                        response, entry = compute(
+                            view_instance, request, args, kwargs, cache_key, etag
+                        )
+                    finally:
+                        cache.delete(lock_key)
+                    if entry is None:
+                        return response
+                elif not fresh and not (stale_ttl and entry is not None):
+                    # Nothing servable until the lock holder is done
+                    entry = _wait_for_entry(entry_key, cache_key, lock_key, lock_timeout)
+                    if entry is None:
+                        return func(view_instance, request, *args, **kwargs)
+                # Otherwise serve the current (or stale) entry while it is refreshed
+
+            response = HttpResponse(entry["content"], content_type=entry["content_type"])
+            response["ETag"] = entry["etag"]
+            if entry["last_modified"] is not None:
+                response["Last-Modified"] = http_date(entry["last_modified"])
+            return get_conditional_response(
+                request,
+                etag=entry["etag"],
+                last_modified=entry["last_modified"],
+                response=response,
+            )
 
         return wrapper
 
@@ -41,7 +327,12 @@ def cache_response(timeout=300, key_prefix=None):
 
 def invalidate_cache(*keys):
     """
-    Utility to delete multiple cache keys.
+    Utility to invalidate multiple cache namespaces.
+
+    Each key is a namespace as built by ``cache_response``: a bare prefix
+    (``products_list``), a user scope (``orders_list_user_3``) or an object
+    (``product_detail_5``). Its generation is bumped, so all keys derived
+    from it miss on the next read without scanning Redis.
     """
     for key in keys:
-        cache.delete(key)
+        bump_cache_generation(key)
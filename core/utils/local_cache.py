@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache-invalidation"
+RECONNECT_DELAY = 1
+
+
+class LocalCache:
+    """
+    Bounded, thread-safe in-process LRU with per-entry TTL.
+
+    Holds small, hot values in front of Redis so a hit costs neither a
+    network round trip nor unpickling. ``invalidations`` counts deletions,
+    letting a caller detect that a key was invalidated while it was reading
+    the value from Redis and skip storing a stale copy.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout, epoch=None):
+        """Store ``value`` unless a deletion happened since ``epoch`` was read."""
+        with self._lock:
+            if epoch is not None and epoch != self.invalidations:
+                return
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self.invalidations += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+local_cache = LocalCache(getattr(settings, "LOCAL_CACHE_MAX_ENTRIES", 1000))
+stats = Counter()
+
+_listener = {"pid": None, "ready": threading.Event()}
+_listener_lock = threading.Lock()
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def _listen(ready):
+    """Drop local keys named by invalidation messages from any process."""
+    while True:
+        try:
+            pubsub = _redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            ready.set()
+            for message in pubsub.listen():
+                local_cache.delete(message["data"].decode())
+        except Exception:
+            logger.exception("Cache invalidation listener disconnected")
+        # Messages may have been missed: local values cannot be trusted any more
+        ready.clear()
+        local_cache.clear()
+        time.sleep(RECONNECT_DELAY)
+
+
+def local_tier_ready():
+    """
+    True once this process is subscribed to invalidation messages, starting
+    the listener on first use (and again in a forked worker).
+    """
+    if _listener["pid"] != os.getpid():
+        with _listener_lock:
+            if _listener["pid"] != os.getpid():
+                _listener["pid"] = os.getpid()
+                _listener["ready"] = threading.Event()
+                local_cache.clear()
+                try:
+                    _redis()
+                except (ImportError, NotImplementedError):
+                    return False  # Not a Redis cache: no local tier
+                threading.Thread(
+                    target=_listen, args=(_listener["ready"],), daemon=True,
+                    name="cache-invalidation-listener",
+                ).start()
+    return _listener["ready"].is_set()
+
+
+def publish_invalidation(key):
+    """Tell every process, this one included, to drop ``key`` from its local tier."""
+    local_cache.delete(key)
+    try:
+        _redis().publish(INVALIDATION_CHANNEL, key)
+    except (ImportError, NotImplementedError):
+        pass
+
+
+def cache_stats():
+    """Hit/miss counters per tier for this process."""
+    counters = dict(stats)
+    tiers = {}
+    for tier in ("local", "redis", "generation_local", "generation_redis"):
+        hits, misses = counters.get(f"{tier}_hits", 0), counters.get(f"{tier}_misses", 0)
+        tiers[tier] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+        }
+    return {
+        "pid": os.getpid(),
+        "local_entries": len(local_cache),
+        "local_max_entries": local_cache.max_entries,
+        "invalidation_listener": _listener["ready"].is_set(),
+        "tiers": tiers,
+    }
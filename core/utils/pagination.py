@@ -0,0 +1,42 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the view's ``?ordering=`` field with ``id`` as the
+    tie-breaker, matching the ``(field, id)`` composite indexes. No COUNT and
+    no OFFSET, so deep pages cost the same as the first one.
+    """
+
+    ordering = ("-created_at",)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering.append("-id" if ordering[0].startswith("-") else "id")
+        return tuple(ordering)
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination (with counts, for the admin UI) unless the client
+    opts into keyset mode with ``?paginate=cursor``. Links returned in
+    cursor mode carry both parameters, so following them stays in that mode.
+    """
+
+    mode_query_param = "paginate"
+    cursor_paginator_class = KeysetCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == "cursor":
+            self.cursor_paginator = self.cursor_paginator_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,159 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _param_list(value):
+    """Comma separated items, or ``None`` when the parameter is absent or names nothing."""
+    items = [item for item in (value or "").split(",") if item]
+    return items or None
+
+
+def _path_tree(paths):
+    """``["id", "items.quantity"]`` -> ``{"id": [], "items": ["quantity"]}``."""
+    tree = {}
+    for path in paths:
+        head, _, rest = path.partition(".")
+        tree.setdefault(head, [])
+        if rest:
+            tree[head].append(rest)
+    return tree
+
+
+def is_sparse_request(request):
+    # ``?fields=`` with nothing in it is the default response, and the cache
+    # (which drops empty values from its keys) treats it as such
+    params = request.query_params
+    return _param_list(params.get(FIELDS_PARAM)) is not None or _param_list(params.get(EXPAND_PARAM)) is not None
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin adding ``?fields=`` and ``?expand=``.
+
+    ``fields`` is a comma separated whitelist; dotted names reach into nested
+    serializers (``items.product.name``). Relations listed in
+    ``Meta.expandable_fields`` render nested by default, but once a client
+    sends either parameter they collapse to their primary key unless named
+    in ``expand`` (``expand=items.product``). Method fields declare the model
+    fields they read in ``Meta.field_dependencies`` so ``prune_queryset``
+    can still narrow the query. Only reads are pruned; writes see every field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only the serializer a view builds has the request; nested ones are
+        # pruned by their parent. Writes keep every field: the whitelist
+        # shapes what is read, not what may be written
+        request = self.context.get("request")
+        if request is not None and request.method in SAFE_METHODS and is_sparse_request(request):
+            self.apply_sparse_fields(
+                _param_list(request.query_params.get(FIELDS_PARAM)),
+                _param_list(request.query_params.get(EXPAND_PARAM)) or [],
+            )
+
+    def apply_sparse_fields(self, fields, expand):
+        field_tree = _path_tree(fields) if fields is not None else {}
+        expand_tree = _path_tree(expand)
+        expandable = getattr(self.Meta, "expandable_fields", ())
+
+        for name in list(self.fields):
+            if fields is not None and name not in field_tree:
+                self.fields.pop(name)
+                continue
+            field = self.fields[name]
+            if name in expandable and name not in expand_tree:
+                kwargs = {} if field.source == name else {"source": field.source}
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **kwargs)
+                continue
+            nested = getattr(field, "child", field)
+            if isinstance(nested, SparseFieldsMixin):
+                nested.apply_sparse_fields(field_tree.get(name) or None, expand_tree.get(name, []))
+
+
+def _column_plan(serializer, model, prefix=""):
+    """
+    ``(only, select_related, prefetches)`` covering what ``serializer`` reads
+    from ``model``, or ``None`` when a field's source cannot be traced.
+    """
+    dependencies = getattr(getattr(serializer, "Meta", None), "field_dependencies", {})
+    only, related, prefetches = [], [], []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == "*" or "." in field.source:
+            if name not in dependencies:
+                return None
+            for path in dependencies[name]:
+                only.append(prefix + path)
+                if "__" in path:
+                    related.append(prefix + path.rsplit("__", 1)[0])
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+
+        nested = getattr(field, "child", field)
+        if not model_field.is_relation:
+            only.append(prefix + field.source)
+        elif model_field.many_to_one or (model_field.one_to_one and model_field.concrete):
+            if not isinstance(nested, serializers.BaseSerializer):
+                only.append(prefix + field.source)  # rendered as its key
+                continue
+            plan = _column_plan(nested, model_field.related_model, f"{prefix}{field.source}__")
+            if plan is None or plan[2]:
+                return None
+            only += [prefix + field.source] + plan[0]
+            related += [prefix + field.source] + plan[1]
+        elif model_field.one_to_many and not prefix and isinstance(nested, serializers.BaseSerializer):
+            plan = _column_plan(nested, model_field.related_model)
+            if plan is None:
+                return None
+            # The FK links rows back to the parent
+            queryset = model_field.related_model._default_manager.only(
+                model_field.field.name, *plan[0]
+            ).prefetch_related(*plan[2])
+            if plan[1]:
+                queryset = queryset.select_related(*plan[1])
+            prefetches.append(Prefetch(field.source, queryset=queryset))
+        else:
+            return None
+    return only, related, prefetches
+
+
+def prune_queryset(queryset, serializer):
+    """
+    Narrow ``queryset`` to the columns ``serializer`` will read: ``.only()``
+    on the model, ``select_related`` for expanded foreign keys and pruned
+    ``Prefetch`` querysets for nested lists. Existing joins and prefetches
+    are replaced by the ones the serializer needs. Returns the queryset
+    unchanged when a field's source cannot be traced.
+    """
+    plan = _column_plan(serializer, queryset.model)
+    if plan is None:
+        return queryset
+    only, related, prefetches = plan
+    queryset = queryset.select_related(None).prefetch_related(None).only(*only or ["pk"])
+    if related:
+        queryset = queryset.select_related(*related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset
+
+
+class SparseQuerysetMixin:
+    """
+    View mixin: on GET requests using ``?fields=`` / ``?expand=``, fetch only
+    the columns the (sparse) serializer renders.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method == "GET" and is_sparse_request(self.request):
+            queryset = prune_queryset(queryset, self.get_serializer())
+        return queryset
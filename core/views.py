@@ -0,0 +1,14 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.utils.local_cache import cache_stats
+
+
+class CacheStatsView(APIView):
+    """Hit/miss counters per cache tier for the worker answering the request (admin only)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats())
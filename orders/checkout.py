@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.utils import timezone
+
+from cart.backends import touch
+from cart.models import Cart, CartItem, StockReservation
+from cart.reservations import release, reservations_enabled
+from catalog.models import Product
+from core.utils.cache_utils import invalidate_cache
+from .models import Order, OrderItem
+
+
+class CheckoutError(Exception):
+    """The cart cannot be turned into an order; nothing was written."""
+
+
+def checkout(user, shipping_address, payment_method):
+    """
+    Turn ``user``'s cart into a pending order as one atomic unit.
+
+    The cart row is locked first, so a repeated checkout waits and then
+    finds the cart empty. The cart's lines are read joined to their
+    products, locking the product rows in id order, which keeps concurrent
+    checkouts from overselling or deadlocking. Stock is checked, the total
+    summed and the order items built in one pass; the order, its items and
+    the stock decrements are then one INSERT, one bulk INSERT and one bulk
+    UPDATE, whatever the cart holds. Raises ``CheckoutError`` for an empty
+    cart or a shortfall, leaving cart and stock untouched.
+    """
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().filter(user=user).first()
+        # Units this cart holds count as available to it. The holds are locked
+        # before the products, in the same order release() and the expiry
+        # sweep take them
+        held = {}
+        if cart is not None and reservations_enabled():
+            held = dict(
+                StockReservation.objects.select_for_update()
+                .filter(cart=cart)
+                .order_by("product_id")
+                .values_list("product_id", "quantity")
+            )
+        lines = []
+        if cart is not None:
+            lines = list(
+                CartItem.objects.filter(cart=cart)
+                .select_related("product")
+                .only(
+                    "quantity", "product", "product__name", "product__price", "product__stock", "product__reserved"
+                )
+                .order_by("product_id")
+                .select_for_update(of=("product",))
+            )
+        if not lines:
+            raise CheckoutError("Cart is empty.")
+
+        now = timezone.now()
+        order = Order(user=user, shipping_address=shipping_address, payment_method=payment_method)
+        items, products, short, total_price = [], [], [], 0
+        for line in lines:
+            product = line.product
+            if product.available + held.get(product.pk, 0) < line.quantity:
+                short.append(product.name)
+                continue
+            items.append(OrderItem(order=order, product=product, quantity=line.quantity, price=product.price))
+            total_price += product.price * line.quantity
+            product.stock -= line.quantity
+            product.updated_at = now
+            products.append(product)
+        if short:
+            raise CheckoutError(f"Not enough stock for {', '.join(short)}")
+
+        order.total_price = total_price
+        order.save()
+        OrderItem.objects.bulk_create(items)
+        Product.objects.bulk_update(products, ["stock", "updated_at"])
+        if held:
+            release(cart.pk)
+        CartItem.objects.filter(cart=cart).delete()
+        touch(Cart.objects.filter(pk=cart.pk))
+        # bulk_update sends no post_save: retire the stock-showing caches here
+        # (orders nest their products too), once the new stock is visible
+        namespaces = [
+            "products_list",
+            "products_facets",
+            "orders_list",
+            "order_detail",
+            *(f"product_detail_{product.pk}" for product in products),
+        ]
+        transaction.on_commit(lambda: invalidate_cache(*namespaces))
+    return order
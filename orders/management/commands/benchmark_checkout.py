@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+
+from cart.models import Cart, CartItem
+from catalog.models import Category, Product
+from orders.checkout import CheckoutError, checkout
+from orders.models import OrderItem
+from users.models import User
+
+BENCH_CATEGORY = "Checkout benchmark"
+BENCH_EMAIL = "checkout-bench-{}@example.com"
+
+
+class Command(BaseCommand):
+    help = "Run concurrent checkouts against scarce synthetic stock; report orders/sec and oversells."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=1000)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--products", type=int, default=20)
+        parser.add_argument("--stock", type=int, default=100, help="Units of each product")
+        parser.add_argument("--items", type=int, default=3, help="Products per cart")
+        parser.add_argument("--keep", action="store_true", help="Keep the synthetic rows afterwards")
+
+    def handle(self, *args, **options):
+        self.cleanup()
+        products, users = self.seed(options)
+        try:
+            placed, refused, seconds = self.run(users, options["threads"])
+            self.stdout.write(
+                f"{placed} orders placed, {refused} refused for stock in {seconds:.2f}s "
+                f"({placed / seconds:.0f} orders/sec, {options['threads']} threads)"
+            )
+            oversold, mismatched = self.verify(products, options["stock"])
+            style = self.style.SUCCESS if not oversold and not mismatched else self.style.ERROR
+            self.stdout.write(style(
+                f"{oversold} units oversold, {mismatched} products whose stock does not match units sold"
+            ))
+        finally:
+            if not options["keep"]:
+                self.cleanup()
+
+    def seed(self, options):
+        rng = random.Random(0)
+        category = Category.objects.create(name=BENCH_CATEGORY)
+        products = Product.objects.bulk_create(
+            Product(
+                name=f"Checkout bench {index}",
+                slug=f"checkout-bench-{index}",
+                price=Decimal("9.99"),
+                stock=options["stock"],
+                category=category,
+            )
+            for index in range(options["products"])
+        )
+        users = User.objects.bulk_create(
+            User(email=BENCH_EMAIL.format(index)) for index in range(options["buyers"])
+        )
+        carts = Cart.objects.bulk_create(Cart(user=user) for user in users)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=product, quantity=rng.randint(1, 3))
+            for cart in carts
+            for product in rng.sample(products, min(options["items"], len(products)))
+        )
+        demand = CartItem.objects.filter(cart__in=carts).aggregate(units=Sum("quantity"))["units"]
+        self.stdout.write(
+            f"{len(users)} carts want {demand} units of {len(products)} products "
+            f"with {options['stock'] * len(products)} in stock"
+        )
+        return products, users
+
+    def run(self, users, threads):
+        counts = {"placed": 0, "refused": 0}
+        lock = threading.Lock()
+
+        def buy(user):
+            try:
+                checkout(user, "1 Benchmark Street", "card")
+                outcome = "placed"
+            except CheckoutError:
+                outcome = "refused"
+            finally:
+                connection.close()
+            with lock:
+                counts[outcome] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(buy, users))
+        return counts["placed"], counts["refused"], time.perf_counter() - started
+
+    def verify(self, products, initial_stock):
+        sold = dict(
+            OrderItem.objects.filter(product__in=products)
+            .values_list("product")
+            .annotate(units=Sum("quantity"))
+        )
+        oversold = mismatched = 0
+        for product in Product.objects.filter(pk__in=[product.pk for product in products]):
+            units = sold.get(product.pk, 0)
+            oversold += max(units - initial_stock, 0)
+            mismatched += product.stock != initial_stock - units
+        return oversold, mismatched
+
+    def cleanup(self):
+        # Orders, carts and their items go with the users and products
+        User.objects.filter(email__startswith="checkout-bench-").delete()
+        Product.objects.filter(category__name=BENCH_CATEGORY).delete()
+        Category.objects.filter(name=BENCH_CATEGORY).delete()
@@ -0,0 +1,9 @@
+from core.utils.export import ExportCommand
+from orders.models import Order
+from orders.views import OrderExportView
+
+
+class Command(ExportCommand):
+    help = "Stream all orders to CSV or NDJSON."
+    model = Order
+    columns = OrderExportView.columns
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:25
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def backfill_paid_at(apps, schema_editor):
+    # Best available approximation for orders paid before the field existed
+    Order = apps.get_model("orders", "Order")
+    Order.objects.filter(
+        Q(payment_status="paid") | Q(status__in=["paid", "shipped", "delivered"]),
+        paid_at__isnull=True,
+    ).update(paid_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_updated_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_paid_at, migrations.RunPython.noop),
+    ]
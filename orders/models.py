@@ -28,6 +28,18 @@ class Order(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    paid_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination for a user's orders and for the staff-wide list
+            models.Index(fields=["user", "created_at", "id"], name="order_user_created_id_idx"),
+            models.Index(fields=["user", "total_price", "id"], name="order_user_total_id_idx"),
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            models.Index(fields=["total_price", "id"], name="order_total_id_idx"),
+            # Incremental exports (?since=)
+            models.Index(fields=["updated_at"], name="order_updated_idx"),
+        ]
 
     def __str__(self):
         return f"Order {self.id} by {self.user}"
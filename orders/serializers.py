@@ -1,22 +1,26 @@
 from rest_framework import serializers
 
 from catalog.serializers import ProductSerializer
+from core.utils.representation import CompiledRepresentationMixin
+from core.utils.sparse_fields import SparseFieldsMixin
 from .models import Order, OrderItem
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsMixin, CompiledRepresentationMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     subtotal = serializers.SerializerMethodField()
 
     class Meta:
         model = OrderItem
         fields = ["id", "product", "quantity", "price", "subtotal"]
+        expandable_fields = ("product",)
+        field_dependencies = {"subtotal": ("quantity", "price")}
 
     def get_subtotal(self, obj):
         return obj.quantity * obj.price
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, CompiledRepresentationMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
@@ -0,0 +1,64 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cart.models import Cart, CartItem
+from catalog.models import Product
+from core.utils.cache_utils import get_cache_generations
+from orders.models import Order, OrderItem
+
+CHECKOUT = {"shipping_address": "1 Street", "payment_method": "card"}
+
+
+@pytest.fixture
+def shopper(make_user, make_product):
+    user = make_user()
+    products = [make_product(stock=3, price="2.50") for _ in range(3)]
+    cart = Cart.objects.create(user=user)
+    CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=2) for product in products)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, products
+
+
+@pytest.mark.django_db
+def test_shortfall_writes_nothing(shopper):
+    client, products = shopper
+    Product.objects.filter(pk=products[-1].pk).update(stock=1)
+
+    response = client.post(reverse("checkout"), CHECKOUT, format="json")
+
+    assert response.status_code == 400
+    assert response.data["detail"] == "Not enough stock for Product 2"
+    assert not Order.objects.exists() and not OrderItem.objects.exists()
+    assert list(Product.objects.order_by("pk").values_list("stock", flat=True)) == [3, 3, 1]
+    assert CartItem.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_cart_is_checked_out_once(shopper):
+    client, _ = shopper
+
+    first = client.post(reverse("checkout"), CHECKOUT, format="json")
+    second = client.post(reverse("checkout"), CHECKOUT, format="json")
+
+    assert first.status_code == 201
+    assert first.data["total_price"] == "15.00"
+    assert second.status_code == 400
+    assert second.data["detail"] == "Cart is empty."
+    assert Order.objects.count() == 1 and OrderItem.objects.count() == 3
+    assert list(Product.objects.values_list("stock", flat=True).distinct()) == [1]
+
+
+@pytest.mark.django_db
+def test_checkout_retires_cached_stock(shopper, django_capture_on_commit_callbacks):
+    client, products = shopper
+    namespaces = ["products_list", "products_facets", *(f"product_detail_{product.pk}" for product in products)]
+    before = get_cache_generations(*namespaces)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse("checkout"), CHECKOUT, format="json")
+
+    assert response.status_code == 201
+    after = get_cache_generations(*namespaces)
+    assert all(new != old for new, old in zip(after, before))
@@ -0,0 +1,55 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from catalog.models import Product
+from catalog.popularity import popularity_weight
+from core.utils.cache_utils import get_cache_generations
+from orders.models import Order, OrderItem
+
+PAYERS = 8
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_payments_record_sales_once(make_user, make_product):
+    user = make_user()
+    product = make_product(stock=10)
+    order = Order.objects.create(user=user, shipping_address="1 Street", payment_method="card", total_price=3)
+    OrderItem.objects.create(order=order, product=product, quantity=3, price=Decimal("1.00"))
+    namespaces = [
+        "products_list",
+        "products_facets",
+        f"order_detail_{order.pk}",
+        f"orders_list_user_{user.pk}",
+        "orders_list_staff",
+    ]
+    generations = get_cache_generations(*namespaces)
+    start = threading.Barrier(PAYERS)
+    codes = []
+
+    def pay():
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            start.wait()
+            codes.append(client.post(reverse("pay_order", args=[order.pk])).status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=pay) for _ in range(PAYERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    order.refresh_from_db()
+    product.refresh_from_db()
+    assert sorted(codes) == [200] + [400] * (PAYERS - 1)
+    assert order.status == "paid"
+    assert product.popularity == pytest.approx(3 * popularity_weight(order.paid_at))
+    # Popularity ordering and the order's status changed: every view showing them was retired
+    assert all(new != old for new, old in zip(get_cache_generations(*namespaces), generations))
@@ -2,6 +2,7 @@ from django.urls import path
 
 from .views import (
     OrderListView,
+    OrderExportView,
     CheckoutView,
     OrderDetailView,
     CancelOrderView,
@@ -12,6 +13,7 @@ from .views import (
 urlpatterns = [
     path("", OrderListView.as_view(), name="order_list"),
     path("<int:pk>/", OrderDetailView.as_view(), name="order_detail"),
+    path("export/", OrderExportView.as_view(), name="order_export"),
     path("checkout/", CheckoutView.as_view(), name="checkout"),
     path("<int:pk>/cancel/", CancelOrderView.as_view(), name="cancel_order"),
     path("<int:pk>/update/", UpdateOrderView.as_view(), name="order-update"),
@@ -1,22 +1,31 @@
 from celery import current_app as celery_app
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, permissions, status, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from cart.models import Cart
+from cart.backends import get_cart_backend
+from catalog.popularity import record_sales
 from core.utils.cache_utils import cache_response, invalidate_cache
+from core.utils.export import export_response
+from core.utils.pagination import PageNumberOrCursorPagination
+from core.utils.sparse_fields import SparseQuerysetMixin
+from .checkout import CheckoutError, checkout
 from .models import Order, OrderItem
 from .serializers import OrderSerializer, OrderUpdateSerializer, CheckoutOrderSerializer
 from .tasks import send_order_confirmation_email
 
-CACHE_TTL = 60 * 10  # 10 minutes
+CACHE_TTL = 60 * 60  # 1 hour, entries are retired by generation bumps
 
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PageNumberOrCursorPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.OrderingFilter,
@@ -28,12 +37,42 @@ class OrderListView(generics.ListAPIView):
     ordering = ["-created_at"]
 
     @cache_response(timeout=CACHE_TTL, key_prefix="orders_list")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         user = self.request.user
         qs = Order.objects.select_related("user").prefetch_related("items__product")
         return qs if user.is_staff else qs.filter(user=user)
 
 
+class OrderExportView(APIView):
+    """
+    Stream all orders as CSV or NDJSON for accounting (admin only).
+
+    Takes the same ``?file_format=``, ``?fields=`` and ``?since=`` options as
+    the product export.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    # Export column -> ORM lookup
+    columns = {
+        "id": "id",
+        "user": "user_id",
+        "user_email": "user__email",
+        "status": "status",
+        "total_price": "total_price",
+        "payment_method": "payment_method",
+        "payment_status": "payment_status",
+        "shipping_address": "shipping_address",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
+
+    def get(self, request, *args, **kwargs):
+        return export_response(Order.objects.all(), self.columns, request.query_params, "orders")
+
+
 class CheckoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -42,43 +81,18 @@ class CheckoutView(APIView):
         responses={201: OrderSerializer, 400: "Bad Request"},
     )
     def post(self, request):
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        if not cart.items.exists():
-            return Response(
-                {"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST
-            )
-
         serializer = CheckoutOrderSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        order = Order.objects.create(
-            user=request.user,
-            shipping_address=serializer.validated_data["shipping_address"],
-            payment_method=serializer.validated_data["payment_method"],
-        )
-
-        total_price = 0
-        for item in cart.items.all():
-            if item.product.stock < item.quantity:
-                return Response(
-                    {"detail": f"Not enough stock for {item.product.name}"},
-                    status=status.HTTP_400_BAD_REQUEST,
+        try:
+            with get_cart_backend().checkout_session(request.user):
+                order = checkout(
+                    request.user,
+                    serializer.validated_data["shipping_address"],
+                    serializer.validated_data["payment_method"],
                 )
-
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price,
-            )
-            # Deduct stock
-            item.product.stock -= item.quantity
-            item.product.save()
-
-            total_price += item.product.price * item.quantity
-
-        order.total_price = total_price
-        order.save()
+        except CheckoutError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         invalidate_cache(f"orders_list_user_{request.user.id}")
 
@@ -90,18 +104,24 @@ class CheckoutView(APIView):
         except Exception:
             # safety net if broker unreachable
             send_order_confirmation_email(order.id)
-        # Clear cart
-        cart.items.all().delete()
 
+        # The order with its items, products and categories in two queries
+        items = OrderItem.objects.select_related("product__category").order_by("id")
+        order = Order.objects.prefetch_related(Prefetch("items", queryset=items)).get(pk=order.pk)
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(SparseQuerysetMixin, generics.RetrieveAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    @cache_response(timeout=CACHE_TTL, key_prefix="order_detail")
+    @cache_response(
+        timeout=CACHE_TTL, key_prefix="order_detail", last_modified_field="updated_at"
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         # short-circuit for swagger schema generation
         if getattr(self, "swagger_fake_view", False):
@@ -170,7 +190,7 @@ class CancelOrderView(APIView):
         for item in order.items.all():
             product = item.product
             product.stock += item.quantity
-            product.save()
+            product.save(update_fields=["stock", "updated_at"])
 
         order.status = "cancelled"
         order.save()
@@ -204,13 +224,23 @@ class PayOrderView(APIView):
 
         # Here we would integrate a real payment gateway
         # For simulation, we mark as paid
-        order.status = "paid"
-        order.payment_status = "paid"
-        order.save()
-
-        # Invalidate caches
-        invalidate_cache(
-            f"order_detail_{order.pk}", f"orders_list_user_{request.user.id}"
-        )
+        paid_at = timezone.now()
+        with transaction.atomic():
+            # Conditional on still pending: of two concurrent payments only
+            # one flips the row, so sales are recorded once
+            paid = Order.objects.filter(pk=pk, user=request.user, status="pending").update(
+                status="paid", payment_status="paid", paid_at=paid_at, updated_at=paid_at
+            )
+            if paid:
+                record_sales(order.items.values_list("product_id", "quantity"), paid_at)
+                # The UPDATE sends no post_save: retire what the Order receiver would
+                transaction.on_commit(lambda: invalidate_cache(
+                    f"order_detail_{order.pk}", f"orders_list_user_{request.user.id}", "orders_list_staff"
+                ))
+        if not paid:
+            return Response(
+                {"detail": "Only pending orders can be paid."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         return Response({"detail": "Payment successful."}, status=status.HTTP_200_OK)